@@ -27,7 +27,7 @@ bl_info = {
 
 ### classes ###
 from bpy_extras.io_utils import ExportHelper, ImportHelper
-from bpy.props import StringProperty, BoolProperty, EnumProperty, FloatProperty
+from bpy.props import StringProperty, BoolProperty, EnumProperty, FloatProperty, IntProperty
 from bpy.types import Operator
 
 
@@ -85,7 +85,7 @@ class Export_PZZ(Operator, ImportHelper):
     
     uv_split: BoolProperty(
         name="Split Faces by UVs",
-        description="Automatically splits face corners that make vertices have multiple UVs to safely store them per vertex",
+        description="Splits vertices whose face corners have different UVs, normals or colors, so each can be stored per vertex",
         default=True,
     )
     
@@ -95,9 +95,68 @@ class Export_PZZ(Operator, ImportHelper):
         default=True,
     )
     
+    compression_level: EnumProperty(
+        name="Compression",
+        description="How hard entries marked as compressed are compressed",
+        items=(
+            ('FAST', "Fast", "Only checks the closest repeated data, for quick test exports"),
+            ('MAX', "Max", "Checks all repeated data in range for the smallest entries"),
+        ),
+        default='MAX',
+    )
+    
+    use_compression_cache: BoolProperty(
+        name="Cache Compressed Entries",
+        description="Reuses compressed data from earlier exports for entries that haven't changed",
+        default=True,
+    )
+    
+    compression_cache_directory: StringProperty(
+        name="Cache Directory",
+        description="Where compressed entries are cached, uses the system's temporary directory if empty",
+        subtype='DIR_PATH',
+        default="",
+    )
+    
+    compression_cache_size: IntProperty(
+        name="Cache Size (MB)",
+        description="Least recently used entries are deleted once the cache grows past this size",
+        default=256,
+        min=1,
+        max=65536,
+    )
+    
+    report_timings: BoolProperty(
+        name="Report Timings",
+        description="Times each step of the export and reports it, the full breakdown is also written to a json file",
+        default=False,
+    )
+    
+    timings_path: StringProperty(
+        name="Timings File",
+        description="Where the json timing report is written, uses the system's temporary directory if empty",
+        subtype='FILE_PATH',
+        default="",
+    )
+    
+    verbose_log: BoolProperty(
+        name="Verbose Log",
+        description="Prints details about every sector to the console, slows the export down",
+        default=False,
+    )
+    
     def execute(self, context):
-        from .file_handling import archive_io
-        return archive_io.export_to_pzz(self, self.filepath, self.user_scale, self.face_type, self.normal_type, self.uv_split, self.z_up)
+        from .file_handling import archive_io, instrumentation
+        cache_directory = None
+        if self.use_compression_cache:
+            cache_directory = bpy.path.abspath(self.compression_cache_directory) if self.compression_cache_directory else ""
+        instrumentation.set_verbose(self.verbose_log)
+        with instrumentation.profiling("PZZ export", self.report_timings) as profiler:
+            result = archive_io.export_to_pzz(self, self.filepath, self.user_scale, self.face_type, self.normal_type, self.uv_split, self.z_up, 
+                                            self.compression_level, cache_directory, self.compression_cache_size * 1024 * 1024)
+        if profiler is not None:
+            instrumentation.report_timings(self, profiler, bpy.path.abspath(self.timings_path) if self.timings_path else None)
+        return result
 
 
 class Import_PZZ(Operator, ImportHelper):
@@ -130,9 +189,33 @@ class Import_PZZ(Operator, ImportHelper):
         default=True,
     )
     
+    report_timings: BoolProperty(
+        name="Report Timings",
+        description="Times each step of the import and reports it, the full breakdown is also written to a json file",
+        default=False,
+    )
+    
+    timings_path: StringProperty(
+        name="Timings File",
+        description="Where the json timing report is written, uses the system's temporary directory if empty",
+        subtype='FILE_PATH',
+        default="",
+    )
+    
+    verbose_log: BoolProperty(
+        name="Verbose Log",
+        description="Prints details about every sector to the console, slows the import down",
+        default=False,
+    )
+    
     def execute(self, context):
-        from .file_handling import archive_io
-        return archive_io.load_from_pzz(self, self.filepath, self.use_z_up, self.user_scale)
+        from .file_handling import archive_io, instrumentation
+        instrumentation.set_verbose(self.verbose_log)
+        with instrumentation.profiling("PZZ import", self.report_timings) as profiler:
+            result = archive_io.load_from_pzz(self, self.filepath, self.use_z_up, self.user_scale)
+        if profiler is not None:
+            instrumentation.report_timings(self, profiler, bpy.path.abspath(self.timings_path) if self.timings_path else None)
+        return result
 
 
 ### ###
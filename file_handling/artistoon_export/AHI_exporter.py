@@ -3,8 +3,8 @@ import math
 import mathutils
 from ..util import flip_yz
 from collections import defaultdict
-from ..binary_rw import int32_write_signed, float_write, pad_with_byte
-from ..sector_handler import insert_header
+from ..binary_rw import int32_write_signed
+from ..sector_handler import SectorWriter, AHI_bone_node
 
 
 def get_ordered_bone_list(armature_obj):
@@ -92,19 +92,7 @@ def get_transform(armature_object, bone_name, z_up, user_scale):
     position = fixvector(position) # shitty 0.000000000000000000000000001 turn to 5.21512482149e-8502918012 values
     rotation = fixvector(rotation)
 
-    transform = bytearray()
-
-    for float in shadow_volume_size:
-        transform.extend(float_write(float))
-    
-    for float in rotation:
-        transform.extend(float_write(float))
-    transform.extend(float_write(1.0))
-    
-    for float in position:
-        transform.extend(float_write(float))
-    transform.extend(float_write(1.0))
-    return transform
+    return shadow_volume_size, (*rotation, 1.0), (*position, 1.0)
 
 
 def to_vector(shit):
@@ -134,7 +122,7 @@ def get_attached_mesh(armature, bone, mesh_objects):
 
 
 def get_ahi(armature_object, use_z_up, user_scale, mesh_objects = None):
-    output_bytes = bytearray()
+    writer = SectorWriter()
     bone_list = []
     entry_info = {
         "index" : armature_object.PZZ_Index,
@@ -146,44 +134,38 @@ def get_ahi(armature_object, use_z_up, user_scale, mesh_objects = None):
         root_bones = [bone for bone in armature_object.data.bones if bone.parent is None]
         bone_list = get_ordered_bone_list(armature_object)
         
-        # root bone list
-        # there's probably a better way of doing this
-        root_list_bytes = bytearray()
-        for root_bone in root_bones:
-            for i, bone in enumerate(bone_list):
-                if bone["name"] == root_bone.name:
-                    root_list_bytes.extend(int32_write_signed(i))
-        insert_header(root_list_bytes, 0x0, len(root_bones))
-
-        # main bone list
-        bone_list_bytes = bytearray()
-        for i, bone in enumerate(bone_list):
-            bone_bytes = bytearray()
-
-            # gather data
-            bone_id = i
-            bone_child = bone["child"] if bone["child"] != None else -1
-            bone_parent = bone["parent"] if bone["parent"] != None else -1
-            bone_sibling = bone["sibling"]  if bone["sibling"] != None else -1
-            bone_mesh = get_attached_mesh(armature_object, bone, mesh_objects)
-            bone_type = 1 + (bone_mesh != -1) | 0x40000000 # todo: double check if auto modellista follows this logic too
-            bone_transform = get_transform(armature_object, bone["name"], use_z_up, user_scale)
-
-            # write
-            bone_bytes.extend(int32_write_signed(bone_id))
-            bone_bytes.extend(int32_write_signed(bone_parent))
-            bone_bytes.extend(int32_write_signed(bone_child))
-            bone_bytes.extend(int32_write_signed(bone_sibling))
-            bone_bytes.extend(bone_transform)
-            bone_bytes.extend(int32_write_signed(bone_mesh))
-            pad_with_byte(bone_bytes, 0x00, 0xBC)
-            insert_header(bone_bytes, bone_type, 1)
-            bone_list_bytes.extend(bone_bytes)
-        
-        output_bytes.extend(root_list_bytes)
-        output_bytes.extend(bone_list_bytes)
-        
         # count total sector count for all bones + the list of root bones 
-        insert_header(output_bytes, 0xC0000000, len(bone_list)+1)
+        with writer.sector(0xC0000000, len(bone_list)+1):
+            # root bone list
+            # there's probably a better way of doing this
+            with writer.sector(0x0, len(root_bones)):
+                for root_bone in root_bones:
+                    for i, bone in enumerate(bone_list):
+                        if bone["name"] == root_bone.name:
+                            writer.write(int32_write_signed(i))
+
+            # main bone list
+            for i, bone in enumerate(bone_list):
+                # gather data
+                bone_id = i
+                bone_child = bone["child"] if bone["child"] != None else -1
+                bone_parent = bone["parent"] if bone["parent"] != None else -1
+                bone_sibling = bone["sibling"]  if bone["sibling"] != None else -1
+                bone_mesh = get_attached_mesh(armature_object, bone, mesh_objects)
+                bone_type = 1 + (bone_mesh != -1) | 0x40000000 # todo: double check if auto modellista follows this logic too
+                bone_shadow_scale, bone_rotation, bone_position = get_transform(armature_object, bone["name"], use_z_up, user_scale)
+
+                # write, the record layout includes the sector header
+                writer.write(AHI_bone_node.pack({
+                    "type"                : bone_type,
+                    "index"               : bone_id,
+                    "parent"              : bone_parent,
+                    "child"               : bone_child,
+                    "brother"             : bone_sibling,
+                    "shadow_scale"        : bone_shadow_scale,
+                    "rotation"            : bone_rotation,
+                    "position"            : bone_position,
+                    "attached_mesh_index" : bone_mesh
+                    }))
     
-    return output_bytes, entry_info, bone_list
\ No newline at end of file
+    return writer.buffer, entry_info, bone_list
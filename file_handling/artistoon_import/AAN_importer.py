@@ -1,7 +1,8 @@
 import bpy
 import os 
 from ..sector_handler import AAN_sector_dict as sector_type_dict
-from ..binary_rw import int08_read, int16_read, int16_read_signed, int32_read, float_read
+from ..binary_rw import int08_read, int16_read, int32_read, float_read, float_read_many, read_many
+from ..instrumentation import logger
 
 
 def get_sector_type(buffer, offset):
@@ -20,23 +21,20 @@ def get_sector_header(buffer, offset):
 def print_sector(sector):
     if len(sector) < 3:
         print("invalid sector!! size under 3")
-    print(f"Sector Type: {sector[0]}, Data Count: {sector[1]}, Size: {sector[2]}")
+    logger.debug("Sector Type: %s, Data Count: %s, Size: %s", *sector)
 
 
 def get_keyframe(buffer, offset, type, action):
     if type == 1:
-        value    = float_read(buffer, offset)
-        frame    = float_read(buffer, offset+0x4)
-        ease_in  = float_read(buffer, offset+0x8)
-        ease_out = float_read(buffer, offset+0xC)
+        value, frame, ease_in, ease_out = float_read_many(buffer, offset, 4)
         if frame > action.frame_end:
             action.frame_end = frame
         return [value, frame, ease_in, ease_out]
     elif type == 2:
-        value    = float(int16_read_signed(buffer, offset) / 2607.5946)    
-        frame    = int16_read_signed(buffer, offset+0x2)
-        ease_in  = float(int16_read_signed(buffer, offset+0x4) / 2607.5946)
-        ease_out = float(int16_read_signed(buffer, offset+0x6) / 2607.5946)
+        value, frame, ease_in, ease_out = read_many(buffer, offset, 'h', 4)
+        value    = value / 2607.5946
+        ease_in  = ease_in / 2607.5946
+        ease_out = ease_out / 2607.5946
         if frame > action.frame_end:
             action.frame_end = frame
         return [value, frame, ease_in, ease_out]
@@ -126,7 +124,7 @@ def read_aan(data, path):
         
         read_offset += 0x8
         for b in range(total_sectors):
-            print(b, read_offset)
+            logger.debug("%s %s", b, read_offset)
             main_sector = get_sector_header(filebuffer, read_offset)
             
             if main_sector[0] == "ProbablyImportant":
@@ -172,7 +170,7 @@ def read_aan(data, path):
                             read_offset += 0x8
                     set_keyframe(armature, animation_name, "rotation", a, c, b, keyframes)
             else:
-                print(main_sector[0])
+                logger.debug("%s", main_sector[0])
                 read_offset += main_sector[2]
     
     created_obj.data[f'actions'] = action_array
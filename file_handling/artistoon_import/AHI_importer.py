@@ -2,8 +2,9 @@ import bpy
 import mathutils
 import math
 from ..util import natural_keys, flip_zy
-from ..sector_handler import get_sector_info, AHI_sector_dict as sector_type_dict
-from ..binary_rw import int16_read, int32_read, int32_read_signed, float_read
+from ..sector_handler import SectorIndex, AHI_containers, AHI_sector_dict as sector_type_dict, AHI_bone_node
+from ..binary_rw import int32_read
+from ..instrumentation import phase, count, logger
 
 
 def get_tree_root_bones(buffer, offset, bone_count, list):
@@ -14,24 +15,17 @@ def get_tree_root_bones(buffer, offset, bone_count, list):
 
 
 def get_bone_data(buffer, offset, user_scale):
+    bone = AHI_bone_node.unpack(buffer, offset)
     return {
-        "type"    : int32_read(buffer, offset) ^ 0x40000000,
-        "index"   : int32_read_signed(buffer, offset+0xC),
-        "parent"  : int32_read_signed(buffer, offset+0x10),
-        "child"   : int32_read_signed(buffer, offset+0x14),
-        "brother" : int32_read_signed(buffer, offset+0x18),
-        "shadow_scale" : mathutils.Vector((float_read(buffer, offset+0x1C), 
-                                    float_read(buffer, offset+0x20), 
-                                    float_read(buffer, offset+0x24), 
-                                    float_read(buffer, offset+0x28))),
-        "rotation" : mathutils.Vector((math.degrees(float_read(buffer, offset+0x2C)),
-                                       math.degrees(float_read(buffer, offset+0x30)),
-                                       math.degrees(float_read(buffer, offset+0x34)))),
-        "position" : mathutils.Vector((float_read(buffer, offset+0x3C)*user_scale,
-                                       float_read(buffer, offset+0x40)*user_scale,
-                                       float_read(buffer, offset+0x44)*user_scale,
-                                       float_read(buffer, offset+0x48)*user_scale)),
-        "attached_mesh_index" : int32_read_signed(buffer, offset+0x4C),
+        "type"    : bone["type"] ^ 0x40000000,
+        "index"   : bone["index"],
+        "parent"  : bone["parent"],
+        "child"   : bone["child"],
+        "brother" : bone["brother"],
+        "shadow_scale" : mathutils.Vector(bone["shadow_scale"]),
+        "rotation" : mathutils.Vector([math.degrees(value) for value in bone["rotation"][:3]]),
+        "position" : mathutils.Vector([value*user_scale for value in bone["position"]]),
+        "attached_mesh_index" : bone["attached_mesh_index"],
     }
     
 
@@ -101,7 +95,7 @@ def build_armature(filename, bone_data_list, root_bone_list, mesh_objects):
         bone.matrix = get_matrix(bone_data) # set transformation matrix
         
         if bone_data_list.index(bone_data) == 20:
-            print(bone.matrix)
+            logger.debug("%s", bone.matrix)
         # todo: add scale property somewhere
     
     for bone_data in bone_data_list:
@@ -144,27 +138,28 @@ def ahi_read(filebuffer, pzz_index, filepath, mesh_objects, use_z_up, user_scale
     filename = f"{filepath}_{pzz_index:03}" if pzz_index != -1 else filepath
     bone_data_list = []
     root_bone_list = []
-    read_offset = 0x0
-    magic_sector = get_sector_info(filebuffer, read_offset)
+    with phase("parse sectors"):
+        index = SectorIndex(filebuffer, AHI_containers)
+    magic = index.find([sector_type_dict["Magic"]])
 
-    if magic_sector["header"] != sector_type_dict["Magic"]:
+    if magic == -1 or index.offset[magic] != 0x0:
         print("Magic sector missing from skeleton file.")
         return
-    read_offset += 0xC # skip over the header
     
-    for x in range(magic_sector["data_count"]):
-        current_sector = get_sector_info(filebuffer, read_offset)
-
-        if (current_sector["header"] & 0x40000000) == sector_type_dict["BoneNode"]:
-            bone_data = get_bone_data(filebuffer, read_offset, user_scale)
-            if use_z_up:
-                flip_zy(bone_data["rotation"])
-                flip_zy(bone_data["position"])
-            bone_data_list.append(bone_data)
-
-        read_offset += current_sector["data_size"]
-
-    return build_armature(filename, bone_data_list, root_bone_list, mesh_objects)
+    with phase("parse sectors"):
+        for sector in index.children(magic):
+            if (index.key[sector] & 0x40000000) == sector_type_dict["BoneNode"]:
+                bone_data = get_bone_data(filebuffer, index.offset[sector], user_scale)
+                if use_z_up:
+                    flip_zy(bone_data["rotation"])
+                    flip_zy(bone_data["position"])
+                bone_data_list.append(bone_data)
+
+    with phase("build armature"):
+        created_armature = build_armature(filename, bone_data_list, root_bone_list, mesh_objects)
+    count("armatures created")
+    count("bones created", len(bone_data_list))
+    return created_armature
 
 
 def read(context, filepath, user_scale, use_z_up):
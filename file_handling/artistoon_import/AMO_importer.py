@@ -1,10 +1,43 @@
 import bpy
-import bmesh
 import math
-import mathutils
-from ..util import flip_zy
-from ..sector_handler import get_sector_info, AMO_sector_dict as sector_types
-from ..binary_rw import int16_read, int32_read, float_read
+import hashlib
+import numpy as np
+from ..util import get_axis_matrix
+from ..sector_handler import SectorIndex, AMO_containers, AMO_sector_dict as sector_types, AMO_material_entry, AMO_texture_entry, AMO_mesh_attributes
+from ..binary_rw import int16_read, int32_read, int32_read_many, float_read_many
+from ..instrumentation import phase, count, logger
+
+
+def get_material_digest(material_property):
+    # materials with the same record and texture entry are the same material, wherever they come from
+    values = tuple(material_property[name] for name in sorted(material_property))
+    return hashlib.sha1(repr(values).encode()).hexdigest()
+
+
+def get_material_properties(material):
+    # the values a material holds now, they can be edited in the material panel after import
+    return {
+    "AMO_MaterialType"  : material.AMO_MaterialType,
+    "AMO_TextureIndex"  : material.AMO_TextureIndex,
+    "AMO_TextureWidth"  : material.AMO_TextureWidth,
+    "AMO_TextureHeight" : material.AMO_TextureHeight,
+    "AMO_ColorUnk1"     : tuple(material.AMO_ColorUnk1),
+    "AMO_ColorUnk2"     : tuple(material.AMO_ColorUnk2),
+    "AMO_ColorUnk3"     : tuple(material.AMO_ColorUnk3),
+    "AMO_Unknown4"      : material.AMO_Unknown4,
+    "AMO_Unknown5"      : material.AMO_Unknown5
+    }
+
+
+def get_material_cache():
+    # materials imported before, in this file or from other archives, by the digest of their current values
+    # so an edited material is only reused for records that match what it holds now
+    # only imported materials are candidates, a material made by hand could hold the default values by chance
+    material_cache = {}
+    for material in bpy.data.materials:
+        if "AMO_Imported" not in material: continue
+        material_cache.setdefault(get_material_digest(get_material_properties(material)), material)
+    return material_cache
 
 
 def create_material(filename, index, material_property):
@@ -21,65 +54,47 @@ def create_material(filename, index, material_property):
     material.AMO_Unknown4      = material_property["AMO_Unknown4"]
     material.AMO_Unknown5      = material_property["AMO_Unknown5"]
     
-    # custom property to later apply the material
-    material["ListIndex"] = index
+    # custom property so later imports can reuse the material
+    material["AMO_Imported"] = True
+    count("materials created")
     return material
 
 
-def build_materials(filename, buffer, offset, material_offset_start):
-    print("Building materials...")
+def build_materials(filename, buffer, index, magic):
+    logger.debug("Building materials...")
     
     texture_property_list = []
     material_property_list = []
-    offset += material_offset_start
     
     # read through material entries
-    material_properties = get_sector_info(buffer, offset)
-    if material_properties["header"] == sector_types["MaterialList"]:
-        offset += 0xC
-        for x in range(material_properties["data_count"]):
-            material_type = int32_read(buffer, offset)
-            # i assume these are color values for shadow, diffuse, and specular
+    material_list = index.find([sector_types["MaterialList"]], magic)
+    if material_list != -1:
+        for entry in index.children(material_list):
+            material = AMO_material_entry.unpack(buffer, index.offset[entry])
+            # i assume the colors are values for shadow, diffuse, and specular
             # they're not actually use for rendering though... so who knows what it's actually for
-            color_unk1 = float_read(buffer, offset+0x0C), float_read(buffer, offset+0x10), float_read(buffer, offset+0x14), float_read(buffer, offset+0x18)
-            color_unk2 = float_read(buffer, offset+0x1C), float_read(buffer, offset+0x20), float_read(buffer, offset+0x24), float_read(buffer, offset+0x28)
-            color_unk3 = float_read(buffer, offset+0x2C), float_read(buffer, offset+0x30), float_read(buffer, offset+0x34), float_read(buffer, offset+0x38)
-            unknown_4 = float_read(buffer, offset+0x3C)
-            unknown_5 = int32_read(buffer, offset+0x40)
-            texture_list_index = int32_read(buffer, offset+0x10C)
-
             material_property_list.append({
-            "AMO_MaterialType"  : material_type,
-            "AMO_TextureIndex"  : texture_list_index, # will be update das we pass through the texture list
+            "AMO_MaterialType"  : material["type"],
+            "AMO_TextureIndex"  : material["texture_index"], # will be update das we pass through the texture list
             "AMO_TextureWidth"  : -1, # will be updated as we pass through the texture list
             "AMO_TextureHeight" : -1, # will be updated as we pass through the texture list
-            "AMO_ColorUnk1"     : color_unk1,
-            "AMO_ColorUnk2"     : color_unk2,
-            "AMO_ColorUnk3"     : color_unk3,
-            "AMO_Unknown4"      : unknown_4,
-            "AMO_Unknown5"      : unknown_5
+            "AMO_ColorUnk1"     : material["color_unk1"],
+            "AMO_ColorUnk2"     : material["color_unk2"],
+            "AMO_ColorUnk3"     : material["color_unk3"],
+            "AMO_Unknown4"      : material["unknown_4"],
+            "AMO_Unknown5"      : material["unknown_5"]
             })
-            
-            material_entry_size = int32_read(buffer, offset+0x8)
-            offset += material_entry_size
     
     # read through texture entries
-    texture_properties = get_sector_info(buffer, offset)
-    if texture_properties["header"] == sector_types["TextureList"]:
-        offset += 0xC
-        for x in range(texture_properties["data_count"]):
-            texture_index  = int32_read(buffer, offset+0xC)
-            texture_width  = int32_read(buffer, offset+0x10)
-            texture_height = int32_read(buffer, offset+0x14)
-
+    texture_list = index.find([sector_types["TextureList"]], magic)
+    if texture_list != -1:
+        for entry in index.children(texture_list):
+            texture = AMO_texture_entry.unpack(buffer, index.offset[entry])
             texture_property_list.append({
-            "TextureIndex" : texture_index,
-            "TextureWidth" : texture_width,
-            "TextureHeight" : texture_height
+            "TextureIndex" : texture["index"],
+            "TextureWidth" : texture["width"],
+            "TextureHeight" : texture["height"]
             })
-
-            texture_entry_size = int32_read(buffer, offset+0x8)
-            offset += texture_entry_size
     
     # update material properties with texture list properties (index, width, height)
     for material_property in material_property_list:
@@ -91,128 +106,166 @@ def build_materials(filename, buffer, offset, material_offset_start):
         material_property["AMO_TextureWidth"] = texture_property["TextureWidth"]
         material_property["AMO_TextureHeight"] = texture_property["TextureHeight"]
 
-    # create the materials
+    # create the materials, or reuse the ones that already exist
+    # the list is in file order, so the mesh material lists index into it directly
+    material_cache = get_material_cache()
     all_materials_list = []
     for index in range(len(material_property_list)):
         material_property = material_property_list[index]
-        all_materials_list.append(create_material(filename, index, material_property))
+        digest = get_material_digest(material_property)
+        if digest not in material_cache:
+            material_cache[digest] = create_material(filename, index, material_property)
+        all_materials_list.append(material_cache[digest])
     return all_materials_list
 
 
-def get_indices(buffer, offset, strip_count, list, strip_length_list):
+def get_indices(buffer, offset, strip_count):
+    # converts all tri strips of a strip sector to a (triangle count, 3) array of vertex indices,
+    # and returns the strip each triangle came from
     offset += 0xC
+    words = np.frombuffer(buffer, dtype='<u4', count=(len(buffer) - offset) // 4, offset=offset)
+    
+    # strips are only found by going through their lengths
+    strip_starts = np.empty(strip_count, dtype=np.int64)
+    strip_lengths = np.empty(strip_count, dtype=np.int64)
+    position = 0
     for x in range(strip_count):
-        count = int16_read(buffer, offset)
-        strip_length_list.append(count-2)
-        index_list = []
-        #cull_mode = int16_read(buffer, offset) # not actually used in rendering?
-        offset += 0x4
-        for y in range(count):
-            vert_index = int32_read(buffer, offset)
-            index_list.append(vert_index)  
-            offset += 0x4
-        # convert tri strip to tri list
-        for y in range(len(index_list)-2):
-            if (y % 2) == 0:
-                list.append([index_list[y], index_list[y+1], index_list[y+2]])
-            else:
-                list.append([index_list[y], index_list[y+2], index_list[y+1]])
-
-
-def get_vert_coords(buffer, offset, sector_size, vertex_count, list, scale, use_z_up):
-    for x in range(vertex_count):
-        vertpos = mathutils.Vector((float_read(buffer, offset)*scale, float_read(buffer, offset+0x4)*scale, float_read(buffer, offset+0x8)*scale))
-        if use_z_up: flip_zy(vertpos)
-        list.append(vertpos)
-        offset += 0xC
-        if offset >= sector_size:
-            return
+        count = int16_read(buffer, offset + position * 4)
+        #cull_mode = int16_read(buffer, offset + position * 4 + 2) # not actually used in rendering?
+        strip_starts[x] = position + 1
+        strip_lengths[x] = count
+        position += 1 + count
 
+    # every strip of n indices has n-2 triangles, with the winding flipped on every other one
+    triangle_counts = np.maximum(strip_lengths - 2, 0)
+    strip_ids = np.repeat(np.arange(strip_count), triangle_counts)
+    triangle_in_strip = np.arange(len(strip_ids)) - np.repeat(np.cumsum(triangle_counts) - triangle_counts, triangle_counts)
+    first = np.repeat(strip_starts, triangle_counts) + triangle_in_strip
+    odd = triangle_in_strip & 1
+    triangles = np.stack((words[first], words[first + 1 + odd], words[first + 2 - odd]), axis=1).astype(np.int64)
+    return triangles, strip_ids
 
-def get_vert_normals(buffer, offset, sector_size, vertex_count, list, use_z_up):
-    for x in range(vertex_count):
-        normal = mathutils.Vector((float_read(buffer, offset), float_read(buffer, offset+0x4), float_read(buffer, offset+0x8)))
-        if use_z_up: flip_zy(normal)
-        list.append(normal)
-        offset += 0xC
-        if offset >= sector_size:
-            return
 
+def get_unique_triangles(triangles, strip_ids):
+    # drops triangles that use the same vertex twice, which strips use to stitch together, and repeats
+    # of an earlier triangle, since neither can be made into a face
+    keep = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 0] != triangles[:, 2])
+    candidates = np.flatnonzero(keep)
+    first = np.unique(np.sort(triangles[candidates], axis=1), axis=0, return_index=True)[1]
+    keep = candidates[np.sort(first)]
+    return triangles[keep], strip_ids[keep]
 
-def get_vert_uvs(buffer, offset, sector_size, vertex_count, list):
-    for x in range(vertex_count):
-        uv = float_read(buffer, offset), 1.0-float_read(buffer, offset+0x4) # UVs are flipped in the Y coordinate
-        list.append(uv)
-        offset += 0x8
-        if offset >= sector_size:
-            return
+
+def get_element_count(offset, sector_size, element_count, element_size):
+    # don't read past the end of the sector, even if the count says otherwise
+    return min(element_count, max(1, -(-(sector_size - offset) // element_size)))
+
+
+def get_vertex_array(buffer, offset, sector_size, vertex_count, width):
+    # (vertex count, width) array of the floats in a vertex sector, read straight from the buffer
+    vertex_count = get_element_count(offset, sector_size, vertex_count, width * 4)
+    return np.frombuffer(buffer, dtype='<f4', count=vertex_count * width, offset=offset).reshape(vertex_count, width)
+
+
+def get_vert_coords(buffer, offset, sector_size, vertex_count, scale, use_z_up):
+    coords = get_vertex_array(buffer, offset, sector_size, vertex_count, 3)
+    return coords @ get_axis_matrix(90.0 if use_z_up else 0.0, scale).T
+
+
+def get_vert_normals(buffer, offset, sector_size, vertex_count, use_z_up):
+    normals = get_vertex_array(buffer, offset, sector_size, vertex_count, 3)
+    if use_z_up: return normals @ get_axis_matrix(90.0).T
+    return normals.copy()
+
+
+def get_vert_uvs(buffer, offset, sector_size, vertex_count):
+    uvs = get_vertex_array(buffer, offset, sector_size, vertex_count, 2).copy()
+    uvs[:, 1] = 1.0 - uvs[:, 1] # UVs are flipped in the Y coordinate
+    return uvs
       
       
-def get_vert_colors(buffer, offset, sector_size, vertex_count, list):
-    for x in range(vertex_count):
-        color = (float_read(buffer,offset)/255, float_read(buffer,offset+0x4)/255,
-        float_read(buffer,offset+0x8)/255, float_read(buffer,offset+0xC)/255)
-        
-        list.append(color)
-        offset += 0x10
-        if offset >= sector_size:
-            return
+def get_vert_colors(buffer, offset, sector_size, vertex_count):
+    return get_vertex_array(buffer, offset, sector_size, vertex_count, 4) / np.float32(255)
 
 
-def get_vert_weights(buffer, offset, sector_size, vertex_count, list):
+def get_vert_weights(buffer, offset, sector_size, vertex_count):
+    # weights are stored per vertex as an influence count followed by (bone id, weight) pairs,
+    # they're returned as flat arrays with the influences of vertex i in offsets[i]:offsets[i+1]
+    start_offset = offset
+    pair_offsets = [] # where each vertex's pairs start
+    influence_counts = []
     for x in range(vertex_count):
         influence_count = int32_read(buffer, offset)
         
         if influence_count > 6:
             print(f"vert {x} influence is over 6!! offset: {hex(offset)}")
-            return
-        
-        offset += 0x4
-        vert_group = []
-        for f in range(influence_count):
-            bone_id = int32_read(buffer, offset)
-            weight = float_read(buffer,offset+0x4) / 100 # influence in the format is 0-100, blender is 0-1
-            vert_group.append({
-                "bone_index"  : bone_id, 
-                "bone_weight" : weight})
-            offset += 0x8
-        list.append(vert_group)
+            break
         
+        pair_offsets.append(offset + 0x4)
+        influence_counts.append(influence_count)
+        offset += 0x4 + 0x8 * influence_count
         
         if offset >= sector_size:
-            return
+            break
 
+    influence_counts = np.array(influence_counts, dtype=np.int64)
+    offsets = np.zeros(len(influence_counts) + 1, dtype=np.int64)
+    np.cumsum(influence_counts, out=offsets[1:])
 
-def get_mesh_attributes(buffer, offset):
-    offset -= 0xC
-    
+    # word position of every pair, counted from the first vertex
+    pair_positions = np.repeat((np.array(pair_offsets, dtype=np.int64) - start_offset) // 4, influence_counts)
+    pair_positions += (np.arange(offsets[-1]) - np.repeat(offsets[:-1], influence_counts)) * 2
+    words = np.frombuffer(buffer, dtype='<u4', count=(offset - start_offset) // 4, offset=start_offset)
     return {
-    "AMO_RenderDistance" : int32_read(buffer, offset + 0x0C),
-    "AMO_Unknown_0x10"   : int32_read(buffer, offset + 0x10),
-    "AMO_Unknown_0x14"   : int32_read(buffer, offset + 0x14),
-    "AMO_Culling"        : int32_read(buffer, offset + 0x18),
-    "AMO_Scissor"        : int32_read(buffer, offset + 0x1C),
-    "AMO_Light"          : int32_read(buffer, offset + 0x20),
-    "AMO_Unknown_0x24"   : int32_read(buffer, offset + 0x24),
-    "AMO_UVScroll"       : int32_read(buffer, offset + 0x28),
-    "AMO_Unknown_0x2C"   : int32_read(buffer, offset + 0x2C),
-    "AMO_FadeColor"      : int32_read(buffer, offset + 0x30),
-    "AMO_Special"        : int32_read(buffer, offset + 0x34),
-    "AMO_Unknown_0x38"   : int32_read(buffer, offset + 0x38),
-    "AMO_Unknown_0x3C"   : int32_read(buffer, offset + 0x3C),
-    "AMO_Unknown_0x40"   : int32_read(buffer, offset + 0x40),
-    "AMO_Unknown_0x44"   : int32_read(buffer, offset + 0x44),
-    "AMO_Unknown_0x48"   : int32_read(buffer, offset + 0x48),
-    "AMO_Unknown_0x4C"   : int32_read(buffer, offset + 0x4C),
-    "AMO_Unknown_0x50"   : int32_read(buffer, offset + 0x50)
-    }
+        "offsets" : offsets,
+        "bones"   : words[pair_positions],
+        "weights" : words.view('<f4')[pair_positions + 1] / np.float32(100)} # influence in the format is 0-100, blender is 0-1
+
+
+def get_vertex_group_batches(weights, vertex_count):
+    # groups the influences by (bone, weight) so each batch can be set with a single VertexGroup.add
+    # returns the bones in the order they're first used, and (bone, weight, vertex indices) batches
+    influence_counts = np.diff(weights["offsets"])
+    vertex_ids = np.repeat(np.arange(len(influence_counts)), influence_counts)
+    in_range = vertex_ids < vertex_count
+    vertex_ids, bones, values = vertex_ids[in_range], weights["bones"][in_range], weights["weights"][in_range]
+    if len(bones) == 0: return [], []
+
+    unique_bones, first_use = np.unique(bones, return_index=True)
+    bone_order = unique_bones[np.argsort(first_use)].tolist()
+
+    # a vertex that names the same bone twice keeps the last weight, like setting them one by one did
+    order = np.lexsort((vertex_ids, bones))
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = (bones[order[1:]] != bones[order[:-1]]) | (vertex_ids[order[1:]] != vertex_ids[order[:-1]])
+    kept = np.sort(order[last])
+    vertex_ids, bones, values = vertex_ids[kept], bones[kept], values[kept]
+
+    order = np.lexsort((values, bones))
+    vertex_ids, bones, values = vertex_ids[order], bones[order], values[order]
+    starts = np.flatnonzero(np.concatenate(([True], (bones[1:] != bones[:-1]) | (values[1:] != values[:-1]))))
+    ends = np.append(starts[1:], len(bones))
+    batches = [(int(bones[start]), float(values[start]), vertex_ids[start:end].tolist()) for start, end in zip(starts, ends)]
+    return bone_order, batches
+
+
+def get_mesh_attributes(buffer, offset):
+    return AMO_mesh_attributes.unpack(buffer, offset)
 
 
 def get_mesh_bounding_data(buf, offset, scale):
-    return (float_read(buf, offset)*scale, float_read(buf, offset+0x4)*scale,float_read(buf, offset+0x8)*scale, float_read(buf, offset+0xC)*scale)
+    return tuple(value*scale for value in float_read_many(buf, offset, 4))
+
 
+def get_padded_array(values, count, width):
+    # (count, width) float32 array, rows missing from values are left as zeroes
+    padded = np.zeros((count, width), dtype=np.float32)
+    values = np.asarray(values, dtype=np.float32).reshape(-1, width)[:count]
+    padded[:len(values)] = values
+    return padded
 
-def build_mesh(all_materials_list, index, filename, mesh_data, striplength):
+
+def build_mesh(all_materials_list, index, filename, mesh_data):
     mesh_name = f"{filename}_AMO_Mesh{index}" 
     target_mesh = bpy.data.meshes.new(mesh_name)
     created_mesh = bpy.data.objects.new(mesh_name, target_mesh)
@@ -220,103 +273,74 @@ def build_mesh(all_materials_list, index, filename, mesh_data, striplength):
 
     # adding material to object
     for mat_index in mesh_data["materials"]:
-        for mat in all_materials_list:
-            if "ListIndex" in mat:
-                if mat["ListIndex"] == mat_index:
-                    target_mesh.materials.append(mat)
-            else:
-                raise Exception("Material is lacking index property! How???")
+        if mat_index < len(all_materials_list):
+            target_mesh.materials.append(all_materials_list[mat_index])
+        else:
+            logger.warning(f"{mesh_name} uses material {mat_index}, but the file only has {len(all_materials_list)}")
 
     
-    # set vertices
-    bm = bmesh.new()
-    for i in range(len(mesh_data["vertices"])):
-        vert = bm.verts.new(mesh_data["vertices"][i])
-    bm.to_mesh(target_mesh)
-    bm.verts.ensure_lookup_table()
-    bm.verts.index_update()
-    
-    # set face indices
-    for vertex_index in mesh_data["indices"]:
-        triangle_index = vertex_index
-        try:
-            face = bm.faces.new((bm.verts[triangle_index[0]], bm.verts[triangle_index[1]], bm.verts[triangle_index[2]]))
-            face.smooth = True
-        except:
-            print(f"invalid face: face = bm.faces.new((bm.verts[{triangle_index[0]}], bm.verts[{triangle_index[1]}], bm.verts[{triangle_index[2]}]))")
-        
-    
-    bm.faces.ensure_lookup_table()
-    bm.faces.index_update()
-
-    # set UVs
-    uv_layer = bm.loops.layers.uv.new()
-    for face in bm.faces:
-        for loop in face.loops:
-            try:
-                loop[uv_layer].uv = mesh_data["UVs"][loop.vert.index]
-            except:
-                print(f"invalid UV: loop[uv_layer].uv = vertUVs[{loop.vert.index}] // vertcount={len(bm.verts)}")
-                continue
-
-    
-    # make "material per face" list from original "per strip" list
-    face_material_list = []
-    loop_index = 0
-    for material_index in mesh_data["material_indices"]:
-        for x in range(striplength[loop_index]):
-            face_material_list.append(material_index)
-        loop_index += 1
-    
-    # set materials of each face
-    for face in bm.faces:
-        material = face_material_list[face.index]
-        face.material_index = material
+    vertices = np.asarray(mesh_data["vertices"], dtype=np.float32).reshape(-1, 3)
+    vertex_count = len(vertices)
+    triangles = mesh_data["indices"]
+
+    # material of each triangle from the "per strip" list
+    strip_materials = np.asarray(mesh_data["material_indices"], dtype=np.int32)
+    strip_ids = mesh_data["strip_ids"]
+    face_materials = np.zeros(len(triangles), dtype=np.int32)
+    has_material = strip_ids < len(strip_materials)
+    face_materials[has_material] = strip_materials[strip_ids[has_material]]
+
+    # degenerate and repeated triangles are already gone, but the indices can still be out of range
+    valid = (triangles < vertex_count).all(axis=1)
+    if not valid.all():
+        logger.warning(f"skipped {np.count_nonzero(~valid)} invalid faces on {mesh_name}")
+    triangles = triangles[valid]
+    face_materials = face_materials[valid]
+    face_count = len(triangles)
+    loop_vertices = triangles.ravel()
+
+    # fill the mesh in bulk
+    target_mesh.vertices.add(vertex_count)
+    target_mesh.vertices.foreach_set("co", vertices.ravel())
+    target_mesh.loops.add(face_count * 3)
+    target_mesh.loops.foreach_set("vertex_index", loop_vertices.astype(np.int32))
+    target_mesh.polygons.add(face_count)
+    target_mesh.polygons.foreach_set("loop_start", np.arange(0, face_count * 3, 3, dtype=np.int32))
+    target_mesh.polygons.foreach_set("material_index", face_materials)
+    target_mesh.polygons.foreach_set("use_smooth", np.ones(face_count, dtype=bool))
+    target_mesh.update(calc_edges=True)
+
+    # set UVs, one per vertex in the format so each loop takes its vertex's
+    uv_layer = target_mesh.uv_layers.new()
+    vertex_uvs = get_padded_array(mesh_data["UVs"], vertex_count, 2)
+    uv_layer.data.foreach_set("uv", vertex_uvs[loop_vertices].ravel())
 
     # set vertex groups
     if len(mesh_data["weights"]) != 0:
-        deform_layer = bm.verts.layers.deform.verify()
-        for vert in bm.verts:
-            for group in mesh_data["weights"][vert.index]:
-                vert_group_name = str(group["bone_index"])
-                vert_group_influence = group["bone_weight"]
-                mesh_group = created_mesh.vertex_groups.get(vert_group_name) or created_mesh.vertex_groups.new(name=vert_group_name)
-                vert[deform_layer][mesh_group.index] = vert_group_influence
-    
-    # pass bmesh to mesh data
-    bm.to_mesh(target_mesh)
-    bm.free()
+        bone_order, batches = get_vertex_group_batches(mesh_data["weights"], vertex_count)
+        mesh_groups = {}
+        for bone_index in bone_order:
+            vert_group_name = str(bone_index)
+            mesh_groups[bone_index] = created_mesh.vertex_groups.get(vert_group_name) or created_mesh.vertex_groups.new(name=vert_group_name)
+        for bone_index, bone_weight, vertex_indices in batches:
+            mesh_groups[bone_index].add(vertex_indices, bone_weight, 'REPLACE')
     
     # set custom normals off import normal data
-    target_mesh.normals_split_custom_set_from_vertices(mesh_data["normals"])
+    if len(mesh_data["normals"]) == vertex_count:
+        target_mesh.normals_split_custom_set_from_vertices(np.asarray(mesh_data["normals"], dtype=np.float32).reshape(-1, 3))
+    else:
+        logger.warning(f"{mesh_name} has {len(mesh_data['normals'])} normals for {vertex_count} vertices, not setting custom normals")
     
     # set vertex colors
     col_attribute = created_mesh.data.color_attributes.new( name="vertex_color", type='FLOAT_COLOR', domain='POINT',)
-    for vertex_index in range(len(created_mesh.data.vertices)):
-        col_attribute.data[vertex_index].color = mesh_data["colors"][vertex_index]
+    col_attribute.data.foreach_set("color", get_padded_array(mesh_data["colors"], vertex_count, 4).ravel())
 
     # set mesh attributes
     created_mesh.data.Export_Type = 'AMO'
     
     if len(mesh_data["attributes"]):
-        created_mesh.data.AMO_RenderDistance = mesh_data["attributes"]["AMO_RenderDistance"]
-        created_mesh.data.AMO_Unknown_0x10   = mesh_data["attributes"]["AMO_Unknown_0x10"]
-        created_mesh.data.AMO_Unknown_0x14   = mesh_data["attributes"]["AMO_Unknown_0x14"]
-        created_mesh.data.AMO_Culling        = mesh_data["attributes"]["AMO_Culling"]
-        created_mesh.data.AMO_Scissor        = mesh_data["attributes"]["AMO_Scissor"]
-        created_mesh.data.AMO_Light          = mesh_data["attributes"]["AMO_Light"]
-        created_mesh.data.AMO_Unknown_0x24   = mesh_data["attributes"]["AMO_Unknown_0x24"]
-        created_mesh.data.AMO_UVScroll       = mesh_data["attributes"]["AMO_UVScroll"]
-        created_mesh.data.AMO_Unknown_0x2C   = mesh_data["attributes"]["AMO_Unknown_0x2C"]
-        created_mesh.data.AMO_FadeColor      = mesh_data["attributes"]["AMO_FadeColor"]
-        created_mesh.data.AMO_Special        = mesh_data["attributes"]["AMO_Special"]
-        created_mesh.data.AMO_Unknown_0x38   = mesh_data["attributes"]["AMO_Unknown_0x38"]
-        created_mesh.data.AMO_Unknown_0x3C   = mesh_data["attributes"]["AMO_Unknown_0x3C"]
-        created_mesh.data.AMO_Unknown_0x40   = mesh_data["attributes"]["AMO_Unknown_0x40"]
-        created_mesh.data.AMO_Unknown_0x44   = mesh_data["attributes"]["AMO_Unknown_0x44"]
-        created_mesh.data.AMO_Unknown_0x48   = mesh_data["attributes"]["AMO_Unknown_0x48"]
-        created_mesh.data.AMO_Unknown_0x4C   = mesh_data["attributes"]["AMO_Unknown_0x4C"]
-        created_mesh.data.AMO_Unknown_0x50   = mesh_data["attributes"]["AMO_Unknown_0x50"]
+        for name, value in mesh_data["attributes"].items():
+            setattr(created_mesh.data, name, value)
     
     if len(mesh_data["bounding"]) > 0:
         created_mesh.data.AMO_HasBounding = True
@@ -325,120 +349,122 @@ def build_mesh(all_materials_list, index, filename, mesh_data, striplength):
     return created_mesh
 
 
+def read_mesh_data(filebuffer, index, mesh_node, use_z_up, user_scale):
+    mesh_triangles        = []
+    mesh_strip_ids        = []
+    strip_total           = 0
+    mesh_materials        = []
+    mesh_vertex_materials = []
+    mesh_vertex_coords    = []
+    mesh_vertex_normals   = []
+    mesh_vertex_UVs       = []
+    mesh_vertex_colors    = []
+    mesh_vertex_weights   = {}
+    mesh_bounding_data    = ()
+    mesh_attributes       = {}
+    
+    for sector in index.children(mesh_node):
+        current_sector = index.sector_info(sector)
+        read_offset = index.data_offset(sector)
+        
+        if current_sector["header"] == sector_types.get("TriStripContainer"):
+            # get strips from all tristrips sectors if it has both or just one
+            for strip_sector in index.children(sector):
+                # there's a sector used for regular tri strips (0x0003)
+                # and then there's another version (0x0004) that has strips that index vertices which
+                # are influenced by more than one bone
+                # i haven't noticed any other variations in either giogio or auto modellista
+                strip_triangles, strip_ids = get_indices(filebuffer, index.offset[strip_sector], index.count[strip_sector])
+                mesh_triangles.append(strip_triangles)
+                mesh_strip_ids.append(strip_ids + strip_total) # strips are numbered across both sectors
+                strip_total += index.count[strip_sector]
+            continue
+
+        if current_sector["header"] == sector_types.get("MeshMaterialList"): # materials used by the mesh
+            mesh_materials.extend(int32_read_many(filebuffer, read_offset, current_sector["data_count"]))
+            continue
+
+        if current_sector["header"] == sector_types.get("MaterialIndices"): # materials per triangle strip
+            mesh_vertex_materials.extend(int32_read_many(filebuffer, read_offset, current_sector["data_count"]))
+            continue
+
+        # vertex data is read into float32 numpy arrays, one row per vertex
+        if current_sector["header"] == sector_types.get("VertexCoordinates"):
+            mesh_vertex_coords = get_vert_coords(filebuffer, read_offset, read_offset+current_sector["data_size"], 
+                            current_sector["data_count"], user_scale, use_z_up)
+
+        if current_sector["header"] == sector_types.get("VertexNormals"):
+            mesh_vertex_normals = get_vert_normals(filebuffer, read_offset, read_offset+current_sector["data_size"], 
+                            current_sector["data_count"], use_z_up)
+
+        if current_sector["header"] == sector_types.get("VertexUVs"):
+            mesh_vertex_UVs = get_vert_uvs(filebuffer, read_offset, read_offset+current_sector["data_size"], 
+                            current_sector["data_count"])
+            
+        if current_sector["header"] == sector_types.get("VertexColors"):
+            mesh_vertex_colors = get_vert_colors(filebuffer, read_offset, read_offset+current_sector["data_size"], 
+                            current_sector["data_count"])
+            
+        if current_sector["header"] == sector_types.get("VertexWeights"):
+            mesh_vertex_weights = get_vert_weights(filebuffer, read_offset, read_offset+current_sector["data_size"], 
+                            current_sector["data_count"])
+        
+        if current_sector["header"] == sector_types.get("Attributes"):
+            mesh_attributes = get_mesh_attributes(filebuffer, read_offset)
+        
+        if current_sector["header"] == sector_types.get("BoundingBox"):
+            mesh_bounding_data = get_mesh_bounding_data(filebuffer, read_offset, user_scale)
+
+    # triangles of both strip sectors, and the strip each one came from for its material
+    mesh_indices, mesh_strip_ids = get_unique_triangles(
+        np.concatenate(mesh_triangles) if mesh_triangles else np.zeros((0, 3), dtype=np.int64),
+        np.concatenate(mesh_strip_ids) if mesh_strip_ids else np.zeros(0, dtype=np.int64))
+
+    mesh_data = {
+    "indices"          : mesh_indices,
+    "strip_ids"        : mesh_strip_ids,
+    "materials"        : mesh_materials, 
+    "material_indices" : mesh_vertex_materials, 
+    "vertices"         : mesh_vertex_coords, 
+    "normals"          : mesh_vertex_normals, 
+    "UVs"              : mesh_vertex_UVs, 
+    "colors"           : mesh_vertex_colors,
+    "weights"          : mesh_vertex_weights,
+    "attributes"       : mesh_attributes,
+    "bounding"         : mesh_bounding_data}
+    return mesh_data
+
+
 def amo_read(filebuffer, pzz_index, filepath, use_z_up, user_scale):
     filename = f"{filepath}_{pzz_index:03}" if pzz_index != -1 else filepath
-    read_offset = 0x0
     created_objects = []
     
-    start_sector = get_sector_info(filebuffer, 0x0)
-    unknown_sector = get_sector_info(filebuffer, 0xC)
+    with phase("parse sectors"):
+        index = SectorIndex(filebuffer, AMO_containers)
+    magic = index.find([sector_types["Magic"]])
     
-    if start_sector["header"] != sector_types["Magic"]:
+    if magic == -1 or index.offset[magic] != 0x0:
         print("Magic sector missing from model file.")
         return []
-    if unknown_sector["header"] != sector_types["Unknown0002"]:
+    if index.find([sector_types["Unknown0002"]], magic) == -1:
         print("Unknown sector (0x20000) missing from model file.")
         return []
 
-    read_offset = 0xC + unknown_sector["data_size"]
-    model_container = get_sector_info(filebuffer, read_offset)
+    model_container = index.find([sector_types["ModelHeader"]], magic)
     
-    if model_container["header"] == sector_types["ModelHeader"]:
-        all_materials_list = build_materials(filename, filebuffer, read_offset, model_container["data_size"])
-
-        print(all_materials_list)
-        read_offset += 0xC # skip over the model container header
-        for model_index in range(model_container["data_count"]):
-            
-            mesh_sector = get_sector_info(filebuffer, read_offset)
-            read_offset += 0xC # skip over mesh sector container header
-            
-            strip_length_list     = []
-            mesh_indices          = []
-            mesh_materials        = []
-            mesh_vertex_materials = []
-            mesh_vertex_coords    = []
-            mesh_vertex_normals   = []
-            mesh_vertex_UVs       = []
-            mesh_vertex_colors    = []
-            mesh_vertex_weights   = []
-            mesh_bounding_data    = ()
-            mesh_attributes       = {}
-            
-            for s in range(mesh_sector["data_count"]):
-                
-                current_sector = get_sector_info(filebuffer, read_offset)
-                read_offset += 0xC
-                
-                if current_sector["header"] == sector_types.get("TriStripContainer"):
-                    # get strips from all tristrips sectors if it has both or just one
-                    for x in range(current_sector["data_count"]):
-                        # there's a sector used for regular tri strips (0x0003)
-                        # and then there's another version (0x0004) that has strips that index vertices which
-                        # are influenced by more than one bone
-                        # i haven't noticed any other variations in either giogio or auto modellista
-                        strip_sector = get_sector_info(filebuffer, read_offset)
-                        get_indices(filebuffer, read_offset, strip_sector["data_count"], mesh_indices, strip_length_list)
-                        read_offset += strip_sector["data_size"]
-                    continue
-
-                if current_sector["header"] == sector_types.get("MeshMaterialList"): # materials used by the mesh
-                    for x in range(current_sector["data_count"]):
-                        material_index = int32_read(filebuffer, read_offset)
-                        mesh_materials.append(material_index)
-                        read_offset += 0x4
-                    continue
-
-                if current_sector["header"] == sector_types.get("MaterialIndices"):
-                    for x in range(current_sector["data_count"]): # materials per triangle strip
-                        material_index = int32_read(filebuffer, read_offset)
-                        mesh_vertex_materials.append(material_index)
-                        read_offset += 0x4
-                    continue
-
-                if current_sector["header"] == sector_types.get("VertexCoordinates"):
-                    get_vert_coords(filebuffer, read_offset, read_offset+current_sector["data_size"], 
-                                    current_sector["data_count"], mesh_vertex_coords, user_scale, use_z_up)
-
-                if current_sector["header"] == sector_types.get("VertexNormals"):
-                    get_vert_normals(filebuffer, read_offset, read_offset+current_sector["data_size"], 
-                                    current_sector["data_count"], mesh_vertex_normals, use_z_up)
-
-                if current_sector["header"] == sector_types.get("VertexUVs"):
-                    get_vert_uvs(filebuffer, read_offset, read_offset+current_sector["data_size"], 
-                                    current_sector["data_count"], mesh_vertex_UVs)
-                    
-                if current_sector["header"] == sector_types.get("VertexColors"):
-                    get_vert_colors(filebuffer, read_offset, read_offset+current_sector["data_size"], 
-                                    current_sector["data_count"], mesh_vertex_colors)
-                    
-                if current_sector["header"] == sector_types.get("VertexWeights"):
-                    get_vert_weights(filebuffer, read_offset, read_offset+current_sector["data_size"], 
-                                    current_sector["data_count"], mesh_vertex_weights)
-                
-                if current_sector["header"] == sector_types.get("Attributes"):
-                    mesh_attributes = get_mesh_attributes(filebuffer, read_offset)
-                
-                if current_sector["header"] == sector_types.get("BoundingBox"):
-                    mesh_bounding_data = get_mesh_bounding_data(filebuffer, read_offset, user_scale)
-            
-                read_offset += current_sector["data_size"] - 0xC
-
-            mesh_data = {
-            "indices"          : mesh_indices,
-            "materials"        : mesh_materials, 
-            "material_indices" : mesh_vertex_materials, 
-            "vertices"         : mesh_vertex_coords, 
-            "normals"          : mesh_vertex_normals, 
-            "UVs"              : mesh_vertex_UVs, 
-            "colors"           : mesh_vertex_colors,
-            "weights"          : mesh_vertex_weights,
-            "attributes"       : mesh_attributes,
-            "bounding"         : mesh_bounding_data}
-            
-            created_objects.append(
-                build_mesh(all_materials_list, model_index, filename, mesh_data, strip_length_list)
-                )
+    if model_container != -1:
+        with phase("build materials"):
+            all_materials_list = build_materials(filename, filebuffer, index, magic)
+
+        logger.debug("%s", all_materials_list)
+        for model_index, mesh_node in enumerate(index.children(model_container)):
+            with phase("parse sectors"):
+                mesh_data = read_mesh_data(filebuffer, index, mesh_node, use_z_up, user_scale)
+            with phase("build mesh"):
+                created_objects.append(
+                    build_mesh(all_materials_list, model_index, filename, mesh_data)
+                    )
+            count("meshes created")
 
     return created_objects
 
@@ -0,0 +1,205 @@
+# compression benchmark, compares the current compressor with the one it replaced,
+# then the ratio and throughput of each compression level
+# runs without blender, from the addon's folder:
+#   python -m file_handling.bench_pzz AFS_DATA/pl00.pzz extracted/
+# .pzz archives add each of their entries (decompressed) to the corpus, other files are used as they are,
+# directories are searched recursively. without any paths a small synthetic corpus is used instead
+
+import sys
+import math
+import time
+import random
+import struct
+import argparse
+from pathlib import Path
+from .pzz_archive import PZZArchive, get_compressed, get_decompressed
+
+
+def get_compressed_reference(b):
+    # the compressor as it was before the hash chains, kept here to compare against
+    bout = bytearray()
+    size_b = len(b) // 2 * 2
+
+    cb = 0  # Control bytes
+    cb_bit = 15
+    cb_pos = 0
+    bout.extend(b"\x00\x00")
+
+    i = 0
+    while i < size_b:
+        start = max(i - 0x7FF * 2, 0)
+        count_r = 0
+        max_i = -1
+        tmp = b[i: i + 2]
+        init_count = len(tmp)
+        while True:
+            start = b.find(tmp, start, i + 1)
+            if start != -1 and start % 2 != 0:
+                start += 1
+                continue
+            if start != -1:
+                count = init_count
+                while i < size_b - count \
+                    and count < 0xFFFF * 2 \
+                    and b[start + count    ] == b[i + count    ] \
+                    and b[start + count + 1] == b[i + count + 1]:
+                    count += 2
+                if count_r < count:
+                    count_r = count
+                    max_i = start
+                start += 2
+            else:
+                break
+        start = max_i
+
+        compress_flag = 0
+        if count_r >= 4:
+            compress_flag = 1
+            offset = i - start
+            offset //= 2
+            count_r //= 2
+            c = offset
+            if count_r <= 0x1F:
+                c |= count_r << 11
+                bout.append(c & 0xFF)
+                bout.append((c >> 8))
+            else:
+                bout.append(c & 0xFF)
+                bout.append((c >> 8))
+                bout.append(count_r & 0xFF)
+                bout.append((count_r >> 8))
+            i += count_r * 2
+        else:
+            bout.extend(b[i: i + 2])
+            i += 2
+        cb |= (compress_flag << cb_bit)
+        cb_bit -= 1
+        if cb_bit < 0:
+            bout[cb_pos + 0] = cb & 0xFF
+            bout[cb_pos + 1] = cb >> 8
+            cb = 0x0000
+            cb_bit = 15
+            cb_pos = len(bout)
+            bout.extend(b"\x00\x00")
+
+    cb |= (1 << cb_bit)
+    bout[cb_pos + 0] = cb & 0xFF
+    bout[cb_pos + 1] = cb >> 8
+    bout.extend(b"\x00\x00")
+
+    return bout
+
+
+def get_synthetic_corpus():
+    # stand-ins shaped like the game's data: float streams with repeated values, bone records, keyframes
+    r = random.Random(1)
+    corpus = {}
+
+    mesh = bytearray()
+    vertex_count = 6000
+    for v in range(vertex_count):
+        mesh += struct.pack("<fff", (v % 40) * 0.5, round(math.sin(v / 50), 3), (v // 40) * 0.5)
+    for v in range(vertex_count):
+        mesh += struct.pack("<fff", 0.0, 1.0, 0.0) if v % 3 else struct.pack("<fff", 0.577, 0.577, 0.577)
+    for v in range(vertex_count):
+        mesh += struct.pack("<ff", (v % 40) / 40, (v // 40) / 150)
+    corpus["mesh-like AMO"] = bytes(mesh)
+
+    bones = bytearray()
+    for b in range(80):
+        bones += struct.pack("<IIIiiii", 0x40000001, 1, 0x10C, b, b - 1, b + 1, -1)
+        bones += struct.pack("<8f", 1, 1, 1, 1, r.random(), 0, 0, 1) + bytes(0xCC)
+    corpus["bone nodes"] = bytes(bones)
+
+    keyframes = bytearray()
+    for k in range(3000):
+        keyframes += struct.pack("<hhhh", r.randrange(-300, 300), k % 60, 0, 0)
+    corpus["keyframes"] = bytes(keyframes)
+
+    corpus["zero run"] = bytes(0x10000)
+    corpus["random"] = r.randbytes(0x8000)
+    return corpus
+
+
+def get_corpus(input_paths):
+    corpus = {}
+    file_paths = []
+    for input_path in map(Path, input_paths):
+        if input_path.is_dir(): file_paths.extend(sorted(p for p in input_path.rglob("*") if p.is_file()))
+        else: file_paths.append(input_path)
+
+    for file_path in file_paths:
+        if file_path.suffix.lower() != ".pzz":
+            corpus[str(file_path)] = file_path.read_bytes()
+            continue
+        with PZZArchive(file_path) as archive:
+            for index, entry in enumerate(archive.entries):
+                if entry["sector_count"] == 0: continue
+                corpus[f"{file_path.name}:{index:03} {entry['type'] or '-'}"] = bytes(archive.read(index))
+    return corpus
+
+
+def time_call(function, *args):
+    start_time = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start_time
+
+
+def print_level_table(corpus):
+    # ratio is compressed size over input size, so lower is better
+    levels = ("FAST", "MAX")
+    totals = {level : [0, 0.0] for level in levels}  # compressed bytes, seconds
+    print(f"{'payload':30} {'size':>10}" + "".join(f" {level + ' ratio':>11} {level + ' MB/s':>10}" for level in levels))
+    for name, data in corpus.items():
+        line = f"{name:30} {len(data):10}"
+        for level in levels:
+            compressed, seconds = time_call(get_compressed, data, level)
+            totals[level][0] += len(compressed)
+            totals[level][1] += seconds
+            line += f" {len(compressed) / max(len(data), 1):10.2%} {len(data) / 1e6 / max(seconds, 1e-9):10.2f}"
+        print(line)
+
+    total_size = sum(len(data) for data in corpus.values())
+    line = f"{'total':30} {total_size:10}"
+    for level in levels:
+        compressed_size, seconds = totals[level]
+        line += f" {compressed_size / max(total_size, 1):10.2%} {total_size / 1e6 / max(seconds, 1e-9):10.2f}"
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m file_handling.bench_pzz", description="Benchmark the PZZ compressor against the previous one and compare compression levels.")
+    parser.add_argument("--no-reference", action="store_true", help="skip the previous compressor, it can take minutes on big entries")
+    parser.add_argument("--no-levels", action="store_true", help="skip the table comparing the compression levels")
+    parser.add_argument("paths", nargs="*", help="PZZ archives, entry files, or directories to search for them")
+    options = parser.parse_args(argv)
+
+    corpus = get_corpus(options.paths) if options.paths else get_synthetic_corpus()
+    if len(corpus) == 0:
+        print("Nothing to compress.")
+        return 1
+
+    mismatches = 0
+    print(f"{'payload':30} {'size':>10} {'compressed':>10} {'old':>9} {'new':>9} {'speedup':>8}  identical")
+    for name, data in corpus.items():
+        compressed, new_time = time_call(get_compressed, data)
+        if get_decompressed(compressed)[:len(data) // 2 * 2] != data[:len(data) // 2 * 2]:
+            print(f"{name}: compressed data doesn't decompress back to the input")
+            mismatches += 1
+
+        if options.no_reference:
+            print(f"{name:30} {len(data):10} {len(compressed):10} {'-':>9} {new_time:8.3f}s {'-':>8}  -")
+            continue
+        reference, old_time = time_call(get_compressed_reference, data)
+        identical = reference == compressed
+        if not identical: mismatches += 1
+        print(f"{name:30} {len(data):10} {len(compressed):10} {old_time:8.3f}s {new_time:8.3f}s {old_time / max(new_time, 1e-9):7.1f}x  {'yes' if identical else 'NO'}")
+
+    if not options.no_levels:
+        print()
+        print_level_table(corpus)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,44 +1,118 @@
 import struct
+from functools import lru_cache
+
+
+# precompiled so the format strings aren't parsed again on every call
+uint8   = struct.Struct('<B')
+uint16  = struct.Struct('<H')
+int16   = struct.Struct('<h')
+uint32  = struct.Struct('<I')
+int32   = struct.Struct('<i')
+float32 = struct.Struct('<f')
+
+
+@lru_cache(maxsize=256)
+def get_struct(format, count=1):
+    # format is the per element format without the byte order, e.g. 'f' or 'If' for (int, float) pairs
+    if len(format) == 1: return struct.Struct(f'<{count}{format}')
+    return struct.Struct('<' + format * count)
 
 
 # WRITE #
 def int08_write(int):
-    return struct.pack('<B', int)
+    return uint8.pack(int)
 
 def int16_write(int):
-    return struct.pack('<H', int)
+    return uint16.pack(int)
 
 def int32_write(int):
-    return struct.pack('<I', int)
+    return uint32.pack(int)
 
 def int32_write_signed(int):
-    return struct.pack('<i', int)
-    
+    return int32.pack(int)
+
 def float_write(float):
-    return struct.pack('<f', float)
+    return float32.pack(float)
 
 def pad_with_byte(input_list, input_byte, size):
-    l = [input_byte] * (size)
-    for v in l:
-        input_list.extend(int08_write(v))
-        
+    input_list.extend(bytes((input_byte,)) * size)
+
 
 # READ #
+# unpack_from reads in place, so buf can be bytes, a bytearray, a memoryview or an mmap without being copied
 
 def int08_read(buf, offset):
-    return struct.unpack("<B", buf[offset:offset+1])[0]
+    return uint8.unpack_from(buf, offset)[0]
 
 def int16_read(buf, offset):
-    return struct.unpack("<H", buf[offset:offset+2])[0]
+    return uint16.unpack_from(buf, offset)[0]
 
 def int16_read_signed(buf, offset):
-    return struct.unpack("<h", buf[offset:offset+2])[0]
+    return int16.unpack_from(buf, offset)[0]
 
 def int32_read(buf, offset):
-    return struct.unpack("<I", buf[offset:offset+4])[0]
+    return uint32.unpack_from(buf, offset)[0]
 
 def int32_read_signed(buf, offset):
-    return struct.unpack("<i", buf[offset:offset+4])[0]
+    return int32.unpack_from(buf, offset)[0]
 
 def float_read(buf, offset):
-    return struct.unpack("<f", buf[offset:offset+4])[0]
\ No newline at end of file
+    return float32.unpack_from(buf, offset)[0]
+
+
+# BULK READ #
+# read count consecutive elements with a single unpack, returns a flat tuple
+
+def read_many(buf, offset, format, count):
+    return get_struct(format, count).unpack_from(buf, offset)
+
+def int32_read_many(buf, offset, count):
+    return read_many(buf, offset, 'I', count)
+
+def float_read_many(buf, offset, count):
+    return read_many(buf, offset, 'f', count)
+
+
+# RECORDS #
+
+class RecordLayout:
+    """Fixed size record compiled into a single struct, so it's read or written with one call.
+
+    fields is a list of (name, format) or (name, format, default) tuples, where format is a struct
+    format code with an optional count, e.g. ("position", "4f"). fields with a count are read as
+    tuples, and fields without a name are padding, which is written as zeroes.
+    """
+    def __init__(self, fields):
+        self.fields = [] # (name, value count or None for single values)
+        self.defaults = {}
+        format = '<'
+        for name, field_format, *default in fields:
+            format += field_format
+            if name is None: continue
+            count = int(field_format[:-1]) if len(field_format) > 1 else None
+            self.fields.append((name, count))
+            if default: self.defaults[name] = default[0]
+        self.struct = struct.Struct(format)
+        self.size = self.struct.size
+        self.names = [name for name, count in self.fields]
+
+    def unpack(self, buf, offset=0):
+        values = self.struct.unpack_from(buf, offset)
+        record = {}
+        i = 0
+        for name, count in self.fields:
+            if count is None:
+                record[name] = values[i]
+                i += 1
+            else:
+                record[name] = values[i:i+count]
+                i += count
+        return record
+
+    def pack(self, record):
+        values = []
+        for name, count in self.fields:
+            value = record[name] if name in record else self.defaults[name]
+            if count is None: values.append(value)
+            else: values.extend(value)
+        return self.struct.pack(*values)
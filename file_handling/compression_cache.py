@@ -0,0 +1,68 @@
+import os
+import hashlib
+import tempfile
+from os import path
+from .instrumentation import logger
+
+
+def get_default_directory():
+    return path.join(tempfile.gettempdir(), "artistoon_pzz_cache")
+
+
+class CompressionCache:
+    """On-disk cache of compressed PZZ entries, keyed by a hash of the uncompressed bytes.
+
+    Each entry is a file named after the hash. Its modification time is refreshed on every hit, so
+    once the cache grows past max_size the least recently used entries are the first to go.
+    Failing to read or write the cache never fails an export, entries just get compressed again.
+    """
+    file_extension = ".pzzc"
+
+    def __init__(self, directory=None, max_size=256 * 1024 * 1024):
+        self.directory = directory or get_default_directory()
+        self.max_size = max_size
+
+    def get_path(self, data, level):
+        # the level is part of the key since each one gives different output for the same bytes
+        digest = hashlib.sha1(level.encode() + b"\x00" + data).hexdigest()
+        return path.join(self.directory, digest + self.file_extension)
+
+    def get(self, data, level):
+        file_path = self.get_path(data, level)
+        try:
+            with open(file_path, "rb") as f:
+                compressed = bytearray(f.read())
+            os.utime(file_path)  # mark as recently used
+            return compressed
+        except OSError:
+            return None
+
+    def put(self, data, level, compressed):
+        file_path = self.get_path(data, level)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # write to a temporary name first so a cut off write never looks like a valid entry
+            temp_path = f"{file_path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(temp_path, file_path)
+            self.evict()
+        except OSError as e:
+            logger.warning(f"Couldn't write to the compression cache: {e}")
+
+    def evict(self):
+        entries = []
+        total_size = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(self.file_extension): continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+        # oldest first
+        entries.sort()
+        for mtime, size, file_path in entries:
+            if total_size <= self.max_size: break
+            os.remove(file_path)
+            total_size -= size
\ No newline at end of file
@@ -0,0 +1,126 @@
+# opt-in timings and counters for imports and exports
+# code marks what it's doing with phase() and count(), which do nothing unless a profiler is active:
+#   with profiling("import") as profiler:
+#       with phase("decompress"):
+#           ...
+#       count("bytes decompressed", len(data))
+# phases nest, so the report shows where the time went inside each one
+
+import json
+import time
+import logging
+import tempfile
+from os import path
+from contextlib import contextmanager, nullcontext
+
+
+# debug messages (e.g. one per sector) go through here so they cost next to nothing when verbose logging is off
+logger = logging.getLogger("artistoon")
+logger.setLevel(logging.WARNING)
+
+
+def set_verbose(verbose):
+    if verbose and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG if verbose else logging.WARNING)
+
+
+def get_default_report_path():
+    return path.join(tempfile.gettempdir(), "artistoon_pzz_timings.json")
+
+
+class Profiler:
+    """Nested phase timings and named counters for one import or export.
+
+    Each phase is a node holding its total time, how many times it was entered and its child phases,
+    so a phase that runs once per mesh shows up once with the time of all meshes added together.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.root = {"time" : 0.0, "calls" : 1, "phases" : {}}
+        self.counters = {}
+        self.stack = [self.root]
+        self.start_time = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        node = self.stack[-1]["phases"].setdefault(name, {"time" : 0.0, "calls" : 0, "phases" : {}})
+        self.stack.append(node)
+        start_time = time.perf_counter()
+        try:
+            yield node
+        finally:
+            node["time"] += time.perf_counter() - start_time
+            node["calls"] += 1
+            self.stack.pop()
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def stop(self):
+        self.root["time"] = time.perf_counter() - self.start_time
+
+    def get_report(self):
+        return {"name" : self.name, **self.root, "counters" : self.counters}
+
+    def get_summary(self):
+        # one line per phase, children indented under their parents, then the counters
+        lines = [f"{self.name}: {self.root['time']:.3f}s"]
+
+        def add_phases(node, depth):
+            for name, child in node["phases"].items():
+                calls = f" ({child['calls']} calls)" if child["calls"] > 1 else ""
+                lines.append(f"{'  ' * depth}{name}: {child['time']:.3f}s{calls}")
+                add_phases(child, depth + 1)
+
+        add_phases(self.root, 1)
+        for name, value in self.counters.items():
+            lines.append(f"  {name}: {value}")
+        return lines
+
+    def write_json(self, filepath):
+        with open(filepath, "w") as f:
+            json.dump(self.get_report(), f, indent=2)
+
+
+active_profiler = None
+
+
+@contextmanager
+def profiling(name, enabled=True):
+    # makes a profiler the active one for the duration, yields None when disabled
+    global active_profiler
+    if not enabled:
+        yield None
+        return
+    previous_profiler = active_profiler
+    active_profiler = Profiler(name)
+    try:
+        yield active_profiler
+    finally:
+        active_profiler.stop()
+        active_profiler = previous_profiler
+
+
+def phase(name):
+    if active_profiler is None: return nullcontext()
+    return active_profiler.phase(name)
+
+
+def count(name, amount=1):
+    if active_profiler is not None:
+        active_profiler.count(name, amount)
+
+
+def report_timings(operator, profiler, filepath=None):
+    # sends the summary to the operator's report and writes the full report as json
+    for line in profiler.get_summary():
+        operator.report({'INFO'}, line)
+    filepath = filepath or get_default_report_path()
+    try:
+        profiler.write_json(filepath)
+        operator.report({'INFO'}, f"Timings written to {filepath}")
+    except OSError as e:
+        operator.report({'WARNING'}, f"Couldn't write timings to {filepath}: {e}")
@@ -0,0 +1,335 @@
+# pzz-unpack, decompression and compression originally written by infval
+# https://github.com/infval/pzzcompressor_jojo/blob/master/pzz_comp_jojo.py
+
+# everything here works without bpy, so it can also be used from the command line (see pzz_tool.py)
+
+import os
+import sys
+import mmap
+import site
+import shutil
+import tempfile
+import importlib.util
+import multiprocessing
+from os import path
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pickle import PicklingError
+from .binary_rw import int16_read, int32_read, int16_write
+from .instrumentation import phase, count, logger
+from .pzz_compressor import get_compressed
+
+
+def pad_to_sector_size(input_bytes):  # edits list and returns entry size val
+    bytes_length = len(input_bytes)
+    if bytes_length <= 0:
+        return input_bytes
+    
+    sector_size = (bytes_length + 0x7FF) // 0x800
+    padding_size = (sector_size * 0x800) - bytes_length
+    
+    input_bytes.extend(bytes(padding_size))
+    return sector_size
+
+
+def write_buffers_to_temp_file(filepath, buffer_list):
+    # writes next to filepath so the result can be renamed over it, returns the temporary file's path
+    file_descriptor, temp_filepath = tempfile.mkstemp(suffix=".tmp", dir=path.dirname(path.abspath(filepath)))
+    try:
+        with os.fdopen(file_descriptor, "wb") as f:
+            f.writelines(buffer_list)
+            f.flush()
+            os.fsync(f.fileno())
+        shutil.copymode(filepath, temp_filepath)
+    except:
+        os.remove(temp_filepath)
+        raise
+    return temp_filepath
+
+
+def replace_entries(filepath, file_replacements):
+    # file_replacements are dicts of index, compressed flag and the entry's bytes, already compressed if flagged
+    # the new archive is assembled as a list of buffers: the updated header, untouched entries as views
+    # into the original file and the replaced entries, then written out in one go
+    replacement_dict = {replacement["index"] : replacement for replacement in file_replacements}
+    with PZZArchive(filepath) as archive:
+        header = bytearray(archive.view[:0x800])
+        buffer_list = [header]
+        header_offset = 0x4
+        for file_index, entry in enumerate(archive.entries):
+            replacement = replacement_dict.pop(file_index, None)
+            if replacement is None:
+                buffer_list.append(archive.get_raw(entry))
+                continue
+
+            new_file_data = replacement["bytes"]
+            sector_size = pad_to_sector_size(new_file_data)
+            logger.debug(f"Replacing file {file_index} at {hex(entry['offset'])}:{hex(entry['offset'] + entry['sector_count'] * 0x800)}")
+            buffer_list.append(new_file_data)
+
+            # update header entry
+            entry_offset = header_offset + (file_index * 0x4)
+            header[entry_offset:entry_offset+2] = int16_write(sector_size)
+            compression_flag = 0x8000 if replacement["compressed"] else 0
+            header[entry_offset+2:entry_offset+4] = int16_write(compression_flag)
+
+        for file_index in replacement_dict:
+            logger.warning(f"PZZ has no file {file_index}, skipping it")
+
+        # keep anything stored after the last entry
+        archive_end = 0x800 + sum(entry["sector_count"] * 0x800 for entry in archive.entries)
+        buffer_list.append(archive.view[archive_end:])
+
+        temp_filepath = write_buffers_to_temp_file(filepath, buffer_list)
+        count("bytes written", sum(len(buffer) for buffer in buffer_list))
+        for buffer in buffer_list:
+            if isinstance(buffer, memoryview): buffer.release()
+
+    # the original is only replaced once the new archive is fully written
+    os.replace(temp_filepath, filepath)
+
+
+class PZZArchive:
+    """Read-only, memory-mapped view of a PZZ archive.
+
+    Opening an archive only parses the header table into one entry per file, holding its offset,
+    sector count, compressed flag and sniffed type. Past the few bytes decoded to sniff its type, an entry
+    is only touched when read() asks for it. Uncompressed entries are handed out as memoryviews into the
+    mapped file instead of copies.
+    """
+
+    def __init__(self, filepath):
+        self.file = open(filepath, "rb")
+        try:
+            self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # empty file, can't be mapped
+            self.file.close()
+            raise
+        self.view = memoryview(self.mapping)
+        self.entries = []
+
+        file_count = int32_read(self.view, 0x0)
+        read_offset = 0x4
+        file_offset = 0x800
+        for i in range(file_count):
+            sector_count = int16_read(self.view, read_offset)
+            entry = {
+                "offset" : file_offset,
+                "sector_count" : sector_count,
+                "compressed" : int16_read(self.view, read_offset+0x2) == 0x8000,
+                "type" : ""
+            }
+            entry["type"] = get_filetype(self.get_head(entry, 0x8))
+            self.entries.append(entry)
+
+            file_offset += sector_count * 0x800
+            read_offset += 0x4
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.view.release()
+        try:
+            self.mapping.close()
+        except BufferError:
+            # something still holds an entry's memoryview, the mapping goes away once that's collected
+            pass
+        self.file.close()
+
+    def get_raw(self, entry):
+        # entry data as stored in the archive, sector padding included
+        return self.view[entry["offset"]:entry["offset"] + entry["sector_count"] * 0x800]
+
+    def get_head(self, entry, size):
+        # first bytes of an entry, only decoding as much as needed to get them
+        raw = self.get_raw(entry)
+        if not entry["compressed"]:
+            return raw[:size]
+        return get_decompressed(raw, size)
+
+    def read(self, index):
+        entry = self.entries[index]
+        raw = self.get_raw(entry)
+        if not entry["compressed"]: return raw
+        with phase("decompress"):
+            data = get_decompressed(raw)
+        count("bytes decompressed", len(data))
+        return data
+
+    def read_chunks(self, index):
+        # same data as read() in pieces, compressed entries are decoded from the file as they're written out
+        # so only the back-reference window is held in memory instead of the whole entry
+        entry = self.entries[index]
+        if not entry["compressed"]:
+            yield self.get_raw(entry)
+            return
+        self.file.seek(entry["offset"])
+        yield from get_decompressed_stream(self.file, entry["sector_count"] * 0x800)
+
+
+def get_filetype(buffer):
+    if len(buffer) < 0x8: return ""
+    read_offset = 0x0
+    test_int1 = int32_read(buffer, read_offset)
+    test_int2 = int32_read(buffer, read_offset+0x4)
+
+    if test_int1 == 1 and (test_int2 > 2 and test_int2 < 6): return "AMO" # model data
+    elif test_int1 == 0xC0000000: return "AHI" # bone data
+    elif test_int2 == 0x40: return "AAN" # animation data -- todo: doesnt apply to player file animations
+    elif test_int2 == 0x50000: return "SDT" # shadow data
+    elif test_int1 == 0x53544948: return "HITS" # stage collision data
+    else: return "" # then we do not care
+
+
+class PZZDecompressor:
+    """Incremental decoder for compressed PZZ entries.
+
+    Compressed data can be fed in chunks of any size, each call returns the output decoded so far.
+    Only the back-reference window and whatever partial token ended the last chunk are kept around.
+    With max_length, decoding stops once that much output is ready. Input that wasn't decoded yet is kept
+    in unused_data and picked up again by the next call.
+    """
+    window_size = 0x7FF * 2  # furthest a back-reference can reach
+
+    def __init__(self):
+        self.window = bytearray()
+        self.unused_data = b""
+        self.cb = 0  # Control bytes
+        self.cb_bit = -1
+        self.eof = False
+        self.pending = 0  # bytes at the end of the window that were decoded but not returned yet
+
+    def decompress(self, data, max_length=-1):
+        b = bytes(self.unused_data) + data if self.unused_data else data
+        bout = self.window
+        output_start = len(bout) - self.pending
+        size_b = 0 if self.eof else len(b) // 2 * 2
+
+        cb = self.cb
+        cb_bit = self.cb_bit
+        i = 0
+        while i + 2 <= size_b:
+            if max_length >= 0 and len(bout) - output_start >= max_length:
+                break
+            if cb_bit < 0:
+                cb  = b[i + 0]
+                cb |= b[i + 1] << 8
+                cb_bit = 15
+                i += 2
+                continue
+
+            if cb & (1 << cb_bit):
+                c  = b[i + 0]
+                c |= b[i + 1] << 8
+                offset = (c & 0x7FF) * 2
+                if offset == 0:
+                    self.eof = True # End of the compressed data
+                    i += 2
+                    break
+                count = (c >> 11) * 2
+                if count == 0:
+                    if i + 4 > size_b: break # count word is in the next chunk
+                    i += 2
+                    c  = b[i + 0]
+                    c |= b[i + 1] << 8
+                    count = c * 2
+
+                index = len(bout) - offset
+                if offset >= count:
+                    bout += bout[index:index + count]
+                else:
+                    # the reference overlaps the bytes it's producing, so the last offset bytes repeat
+                    # grow the copy by doubling it instead of appending byte by byte
+                    run = bout[index:]
+                    while len(run) < count:
+                        run = run + run
+                    bout += run[:count]
+            else:
+                bout += b[i: i + 2]
+            cb_bit -= 1
+            i += 2
+
+        self.cb = cb
+        self.cb_bit = cb_bit
+        self.unused_data = b[i:]
+
+        output_end = len(bout)
+        if max_length >= 0:
+            output_end = min(output_end, output_start + max_length)
+        self.pending = len(bout) - output_end
+
+        # keep just enough of the output for later back-references
+        keep_size = max(self.window_size, self.pending)
+        if output_start == 0 and self.pending == 0:
+            output = bout
+            self.window = bout[-keep_size:]
+        else:
+            output = bout[output_start:output_end]
+            del bout[:-keep_size]
+        return output
+
+
+def get_decompressed(b, max_length=-1):
+    return PZZDecompressor().decompress(b, max_length)
+
+
+def get_decompressed_stream(f, size, chunk_size=0x800):
+    # decode an entry straight from an open file, yields decompressed chunks as they become available
+    decompressor = PZZDecompressor()
+    while size > 0 and not decompressor.eof:
+        chunk = f.read(min(size, chunk_size))
+        if len(chunk) == 0: break
+        size -= len(chunk)
+        output = decompressor.decompress(chunk)
+        if len(output) > 0: yield output
+
+
+def get_worker_compressor():
+    # workers are always spawned: forking blender isn't safe and windows and macos can't fork anyway
+    # a spawned worker can't import this package, the addon's __init__ imports bpy, so workers load
+    # pzz_compressor.py as a top-level module instead. the function sent to them is pickled by module
+    # name, so it has to come from the same file loaded under that same top-level name here
+    module = sys.modules.get("pzz_compressor")
+    if module is None:
+        spec = importlib.util.spec_from_file_location("pzz_compressor", path.join(path.dirname(__file__), "pzz_compressor.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules["pzz_compressor"] = module
+    return module.get_compressed
+
+
+def get_compressed_entries(entries, level='MAX', cache=None, parallel_min_size=0x10000):
+    # the compressor is pure python and cpu bound, so entries big enough to be worth
+    # a worker process get compressed in parallel, smaller ones stay in this process
+    # results are returned in the same order as the entries
+    compressed_entries = [None] * len(entries)
+    if cache is not None:
+        compressed_entries = [cache.get(bytes(entry), level) for entry in entries]
+    missing_indices = [i for i, compressed in enumerate(compressed_entries) if compressed is None]
+    count("compression cache hits", len(entries) - len(missing_indices))
+    parallel_indices = [i for i in missing_indices if len(entries[i]) >= parallel_min_size]
+    worker_count = min(len(parallel_indices), os.cpu_count() or 1)
+
+    if worker_count > 1:
+        try:
+            # workers find pzz_compressor.py by having this folder added to their sys.path before any work arrives
+            with ProcessPoolExecutor(max_workers=worker_count, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=site.addsitedir, initargs=(path.dirname(__file__),)) as executor:
+                results = executor.map(get_worker_compressor(), [bytes(entries[i]) for i in parallel_indices], repeat(level))
+                for i, compressed in zip(parallel_indices, results):
+                    compressed_entries[i] = compressed
+        except (BrokenProcessPool, PicklingError, ImportError, OSError) as e:
+            # e.g. the python blender runs can't be started as a separate process
+            logger.warning(f"Parallel compression unavailable, compressing serially: {e}")
+
+    for i in missing_indices:
+        if compressed_entries[i] is None:
+            compressed_entries[i] = get_compressed(entries[i], level)
+        if cache is not None:
+            cache.put(bytes(entries[i]), level, compressed_entries[i])
+    return compressed_entries
\ No newline at end of file
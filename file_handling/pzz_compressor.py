@@ -0,0 +1,117 @@
+# the compressor, kept apart from the rest of the archive code with no imports from this package
+# so worker processes can load this file on its own, see get_compressed_entries in pzz_archive.py
+
+from bisect import bisect_left
+from itertools import islice
+
+
+def get_match_length(data, start, i, count, limit):
+    # extend a match in big steps first so long runs aren't compared one word at a time
+    for step in (0x1000, 0x100, 0x10, 0x2):
+        while count + step <= limit and data[start + count:start + count + step] == data[i + count:i + count + step]:
+            count += step
+    return count
+
+
+class PZZMatchFinder:
+    """Finds back-references for the PZZ compressor.
+
+    Every aligned position goes into a hash chain keyed by the two words found there. A match has to be
+    at least two words long, so only positions sharing the key can be candidates. Chains are kept in
+    ascending order and searched oldest first, the same order the original b.find loop used.
+    """
+
+    def __init__(self, data, max_chain=0):
+        self.data = data
+        self.size = len(data) // 2 * 2
+        self.max_chain = max_chain  # how many of the closest candidates get checked, 0 checks the whole window
+        self.chains = {}
+        self.chain_end = 0  # positions before this one are already in the chains
+
+    def find(self, i):
+        # returns the length in bytes and start of the longest match for position i, length 0 if there isn't one
+        data = self.data
+        while self.chain_end < i:
+            key = data[self.chain_end:self.chain_end + 4]
+            chain = self.chains.get(key)
+            if chain is None: self.chains[key] = [self.chain_end]
+            else: chain.append(self.chain_end)
+            self.chain_end += 2
+
+        count_r = 0
+        max_i = -1
+        chain = self.chains.get(data[i:i + 4]) if i + 4 <= self.size else None
+        if chain:
+            window_start = bisect_left(chain, i - 0x7FF * 2)
+            if window_start > 0x100:  # drop positions that fell out of the window for good
+                del chain[:window_start]
+                window_start = 0
+            if self.max_chain:
+                window_start = max(window_start, len(chain) - self.max_chain)
+
+            limit = min(self.size - i, 0xFFFF * 2)
+            for start in islice(chain, window_start, None):
+                # a candidate can only win if it also matches the word right after the best match so far
+                if count_r and data[start + count_r:start + count_r + 2] != data[i + count_r:i + count_r + 2]:
+                    continue
+                count = get_match_length(data, start, i, 4, limit)
+                if count_r < count:
+                    count_r = count
+                    max_i = start
+                    if count == limit: break
+        return count_r, max_i
+
+
+def get_compressed(b, level='MAX'):
+    # FAST only checks the closest candidates for each match, MAX checks the whole window
+    data = bytes(b)
+    finder = PZZMatchFinder(data, max_chain=0x10 if level == 'FAST' else 0)
+    size_b = finder.size
+
+    bout = bytearray()
+
+    cb = 0  # Control bytes
+    cb_bit = 15
+    cb_pos = 0
+    bout.extend(b"\x00\x00")
+
+    i = 0
+    while i < size_b:
+        count_r, start = finder.find(i)
+
+        compress_flag = 0
+        if count_r >= 4:
+            compress_flag = 1
+            offset = i - start
+            offset //= 2
+            count_r //= 2
+            c = offset
+            if count_r <= 0x1F:
+                c |= count_r << 11
+                bout.append(c & 0xFF)
+                bout.append((c >> 8))
+            else:
+                bout.append(c & 0xFF)
+                bout.append((c >> 8))
+                bout.append(count_r & 0xFF)
+                bout.append((count_r >> 8))
+            i += count_r * 2
+        else:
+            bout.extend(data[i: i + 2])
+            i += 2
+        cb |= (compress_flag << cb_bit)
+        cb_bit -= 1
+        if cb_bit < 0:
+            bout[cb_pos + 0] = cb & 0xFF
+            bout[cb_pos + 1] = cb >> 8
+            cb = 0x0000
+            cb_bit = 15
+            cb_pos = len(bout)
+            bout.extend(b"\x00\x00")
+
+    cb |= (1 << cb_bit)
+    bout[cb_pos + 0] = cb & 0xFF
+    bout[cb_pos + 1] = cb >> 8
+    bout.extend(b"\x00\x00")
+
+    return bout
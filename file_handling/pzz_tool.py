@@ -0,0 +1,168 @@
+# command line tool for working with PZZ archives outside of blender
+# run it from the addon's folder, e.g.:
+#   python -m file_handling.pzz_tool list AFS_DATA/
+#   python -m file_handling.pzz_tool extract AFS_DATA/ -o extracted/
+#   python -m file_handling.pzz_tool repack AFS_DATA/ -i extracted/
+#   python -m file_handling.pzz_tool recompress AFS_DATA/pl00.pzz --level FAST
+# directories are searched recursively for .pzz files, and archives are processed in parallel
+
+import os
+import sys
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from .pzz_archive import PZZArchive, get_compressed, get_decompressed, replace_entries
+from .instrumentation import set_verbose
+
+
+def get_archive_paths(input_paths):
+    archive_paths = []
+    for input_path in input_paths:
+        input_path = Path(input_path)
+        if input_path.is_dir():
+            archive_paths.extend(sorted(p for p in input_path.rglob("*") if p.suffix.lower() == ".pzz" and p.is_file()))
+        else:
+            archive_paths.append(input_path)
+    return archive_paths
+
+
+def get_entry_filename(index, entry):
+    extension = entry["type"].lower() if entry["type"] else "bin"
+    return f"{index:03}.{extension}"
+
+
+def list_archive(archive_path, options):
+    lines = [f"{archive_path}:"]
+    with PZZArchive(archive_path) as archive:
+        for index, entry in enumerate(archive.entries):
+            compressed = "compressed" if entry["compressed"] else ""
+            lines.append(f"  {index:03} offset {entry['offset']:#010x} sectors {entry['sector_count']:4} {entry['type'] or '-':5} {compressed}")
+    return "\n".join(lines)
+
+
+def extract_archive(archive_path, options):
+    output_directory = Path(options.output) / archive_path.stem
+    output_directory.mkdir(parents=True, exist_ok=True)
+    extracted_count = 0
+    with PZZArchive(archive_path) as archive:
+        for index, entry in enumerate(archive.entries):
+            if entry["sector_count"] == 0: continue
+            with open(output_directory / get_entry_filename(index, entry), "wb") as f:
+                f.writelines(archive.read_chunks(index))
+            extracted_count += 1
+    return f"{archive_path}: extracted {extracted_count} files to {output_directory}"
+
+
+def repack_archive(archive_path, options):
+    # entries are replaced by files named after their index in <input>/<archive name>/, as written by extract
+    input_directory = Path(options.input) / archive_path.stem
+    if not input_directory.is_dir():
+        return f"{archive_path}: nothing to repack, {input_directory} doesn't exist"
+
+    file_replacements = []
+    with PZZArchive(archive_path) as archive:
+        for file_path in sorted(input_directory.iterdir()):
+            index_text = file_path.name.split(".")[0]
+            if not index_text.isdigit() or int(index_text) >= len(archive.entries): continue
+            index = int(index_text)
+            is_compressed = archive.entries[index]["compressed"]
+            new_file_data = bytearray(file_path.read_bytes())
+            if is_compressed: new_file_data = get_compressed(new_file_data, options.level)
+            file_replacements.append({
+                "index" : index,
+                "compressed" : is_compressed,
+                "bytes" : new_file_data
+            })
+
+    replace_entries(archive_path, file_replacements)
+    return f"{archive_path}: repacked {len(file_replacements)} files"
+
+
+def recompress_archive(archive_path, options):
+    file_replacements = []
+    old_size = new_size = 0
+    with PZZArchive(archive_path) as archive:
+        for index, entry in enumerate(archive.entries):
+            if not entry["compressed"] or entry["sector_count"] == 0: continue
+            new_file_data = get_compressed(get_decompressed(archive.get_raw(entry)), options.level)
+            old_size += entry["sector_count"] * 0x800
+            new_size += (len(new_file_data) + 0x7FF) // 0x800 * 0x800
+            file_replacements.append({
+                "index" : index,
+                "compressed" : True,
+                "bytes" : new_file_data
+            })
+
+    replace_entries(archive_path, file_replacements)
+    return f"{archive_path}: recompressed {len(file_replacements)} files, {old_size:#x} -> {new_size:#x} bytes"
+
+
+def run_command(command, archive_path, options):
+    # returns whether the archive was handled along with the message to print for it
+    # set here as well since worker processes don't always inherit the logger's level
+    set_verbose(options.verbose)
+    try:
+        return True, command(archive_path, options)
+    except Exception as e:
+        return False, f"{archive_path}: failed, {e}"
+
+
+def print_results(results):
+    # prints each result as it comes in, failures to stderr, and returns how many archives failed
+    failed_count = 0
+    for succeeded, message in results:
+        if succeeded:
+            print(message)
+        else:
+            print(message, file=sys.stderr)
+            failed_count += 1
+    return failed_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m file_handling.pzz_tool", description="List, extract, repack and recompress PZZ archives.")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="how many archives are processed at the same time")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log what's done to each entry")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="print the entries of each archive")
+    list_parser.set_defaults(function=list_archive)
+
+    extract_parser = subparsers.add_parser("extract", help="write every entry, decompressed, to <output>/<archive name>/")
+    extract_parser.add_argument("-o", "--output", default=".", help="directory the entries are extracted to")
+    extract_parser.set_defaults(function=extract_archive)
+
+    repack_parser = subparsers.add_parser("repack", help="replace entries with the files in <input>/<archive name>/")
+    repack_parser.add_argument("-i", "--input", default=".", help="directory holding the extracted entries")
+    repack_parser.set_defaults(function=repack_archive)
+
+    recompress_parser = subparsers.add_parser("recompress", help="compress every compressed entry again")
+    recompress_parser.set_defaults(function=recompress_archive)
+
+    for subparser in (repack_parser, recompress_parser):
+        subparser.add_argument("--level", choices=("FAST", "MAX"), default="MAX", help="compression level for compressed entries")
+    for subparser in (list_parser, extract_parser, repack_parser, recompress_parser):
+        subparser.add_argument("paths", nargs="+", help="PZZ files, or directories to search for them")
+
+    options = parser.parse_args(argv)
+    archive_paths = get_archive_paths(options.paths)
+    if len(archive_paths) == 0:
+        print("No PZZ archives found.")
+        return 1
+
+    worker_count = max(1, min(options.jobs, len(archive_paths)))
+    if worker_count == 1:
+        failed_count = print_results(run_command(options.function, archive_path, options) for archive_path in archive_paths)
+    else:
+        with ProcessPoolExecutor(max_workers=worker_count) as executor:
+            failed_count = print_results(executor.map(run_command, [options.function] * len(archive_paths), archive_paths, [options] * len(archive_paths)))
+
+    # a nonzero exit code lets scripts notice when part of a batch failed
+    if failed_count > 0:
+        print(f"{failed_count} of {len(archive_paths)} archives failed.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
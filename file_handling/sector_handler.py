@@ -1,9 +1,11 @@
-from .binary_rw import int32_write, int32_read
+from array import array
+from contextlib import contextmanager
+from .binary_rw import get_struct, RecordLayout
+
+sector_header = get_struct('I', 3) # key, data count, size including the header
 
 def get_sector_info(buffer, offset):
-    head = int32_read(buffer, offset)
-    count = int32_read(buffer, offset+4)
-    size = int32_read(buffer, offset+8)
+    head, count, size = sector_header.unpack_from(buffer, offset)
 
     return {
         "header" : head,
@@ -12,11 +14,128 @@ def get_sector_info(buffer, offset):
     }
 
 
-def insert_header(byte_array, sector_key, data_count):
-    sector_size = len(byte_array) + 0xC
-    byte_array[0:0] = int32_write(sector_key)
-    byte_array[4:4] = int32_write(data_count)
-    byte_array[8:8] = int32_write(sector_size)
+class SectorIndex:
+    """Tree of the sectors in a file, built in one pass over the sector headers without reading any data.
+
+    containers maps a parent sector key (None for the top level) to the keys of the sectors that hold other
+    sectors when they're found under that parent. it depends on the parent since keys mean different things
+    at different depths, material entries use the material type as their key for example.
+    children are found by walking each container's data sector by sector, using the sizes and not the counts,
+    since the counts aren't always right on exported files.
+    nodes are numbered in file order and kept in flat arrays, so the whole file can be indexed up front
+    and only the sectors that are needed get read afterwards.
+    """
+    def __init__(self, buffer, containers):
+        self.containers = containers
+        self.key          = array('I')
+        self.count        = array('I')
+        self.offset       = array('I')
+        self.size         = array('I')
+        self.parent       = array('i')
+        self.first_child  = array('i')
+        self.next_sibling = array('i')
+        self.first_root = -1
+        self.add_children(buffer, -1, None, 0, len(buffer))
+
+    def add_children(self, buffer, parent, parent_key, offset, end):
+        child_containers = self.containers.get(parent_key, ())
+        previous = -1
+        while offset + 0xC <= end:
+            key, count, size = sector_header.unpack_from(buffer, offset)
+            node = len(self.key)
+            self.key.append(key)
+            self.count.append(count)
+            self.offset.append(offset)
+            self.size.append(size)
+            self.parent.append(parent)
+            self.first_child.append(-1)
+            self.next_sibling.append(-1)
+
+            if previous != -1: self.next_sibling[previous] = node
+            elif parent != -1: self.first_child[parent] = node
+            else: self.first_root = node
+            previous = node
+
+            if key in child_containers:
+                if size < 0xC:
+                    # a container without a usable size is taken to run until the end of its parent
+                    self.add_children(buffer, node, key, offset + 0xC, end)
+                    break
+                self.add_children(buffer, node, key, offset + 0xC, min(offset + size, end))
+            
+            if size < 0xC: break # no way to tell where the next sector starts
+            offset += size
+
+    def children(self, node=-1):
+        # node -1 is the top level of the file
+        child_list = []
+        child = self.first_root if node == -1 else self.first_child[node]
+        while child != -1:
+            child_list.append(child)
+            child = self.next_sibling[child]
+        return child_list
+
+    def find(self, path, node=-1):
+        # first sector reached by following the list of keys in path, -1 if there's none
+        for child in self.children(node):
+            if self.key[child] != path[0]: continue
+            if len(path) == 1: return child
+            found = self.find(path[1:], child)
+            if found != -1: return found
+        return -1
+
+    def data_offset(self, node):
+        return self.offset[node] + 0xC
+
+    def sector_info(self, node):
+        # same as get_sector_info, plus where the sector starts
+        return {
+            "header" : self.key[node],
+            "data_count" : self.count[node],
+            "data_size" : self.size[node],
+            "offset" : self.offset[node]
+        }
+
+
+class SectorWriter:
+    """Writes a file forward into a single buffer.
+
+    opening a sector reserves space for its header, and the count and size are filled in once it's closed,
+    so nested sectors don't have to be copied around to put their headers in front of them.
+
+        with writer.sector(0x00000004) as mesh_sector: # count is the number of sectors written inside it
+            with writer.sector(0x00070000, vertex_count):
+                writer.write(coordinate_bytes)
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+        self.open_sectors = []
+
+    def write(self, data):
+        self.buffer.extend(data)
+
+    @contextmanager
+    def sector(self, key, count=None):
+        # the yielded dict can be changed while the sector is open, e.g. to set the count once it's known
+        sector = {
+            "key" : key,
+            "count" : count,
+            "offset" : len(self.buffer),
+            "children" : 0
+        }
+        if self.open_sectors: self.open_sectors[-1]["children"] += 1
+        self.open_sectors.append(sector)
+        self.buffer.extend(bytes(0xC))
+        try:
+            yield sector
+        finally:
+            self.open_sectors.pop()
+        data_count = sector["children"] if sector["count"] is None else sector["count"]
+        sector_header.pack_into(self.buffer, sector["offset"], sector["key"], data_count, len(self.buffer) - sector["offset"])
+
+    def write_sector(self, key, count, data):
+        with self.sector(key, count):
+            self.buffer.extend(data)
 
 
 # Animation
@@ -70,3 +189,65 @@ AMO_sector_dict = {
     "TextureList"       : 0x0000000A  #  function: plAMOGetTextureHead
     }
 
+
+
+# Sectors that hold other sectors, by the key of their parent, for SectorIndex
+AMO_containers = {
+    None                                   : {AMO_sector_dict["Magic"]},
+    AMO_sector_dict["Magic"]               : {AMO_sector_dict["ModelHeader"], AMO_sector_dict["MaterialList"], AMO_sector_dict["TextureList"]},
+    AMO_sector_dict["ModelHeader"]         : {AMO_sector_dict["MeshDataContainer"]},
+    AMO_sector_dict["MeshDataContainer"]   : {AMO_sector_dict["TriStripContainer"]}
+    }
+
+AHI_containers = {
+    None : {AHI_sector_dict["Magic"]}
+    }
+
+# Fixed size records, shared by the importers and exporters
+# each material, texture and bone entry is a sector of its own, so the layouts start with the sector header
+
+AMO_material_entry = RecordLayout([
+    ("type",          "I"),
+    ("count",         "I", 1),
+    ("size",          "I", 0x110),
+    ("color_unk1",    "4f"), # 0x0C
+    ("color_unk2",    "4f"), # 0x1C
+    ("color_unk3",    "4f"), # 0x2C
+    ("unknown_4",     "f"),  # 0x3C
+    ("unknown_5",     "I"),  # 0x40
+    (None,            f"{0xC8}x"),
+    ("texture_index", "I")   # 0x10C, index into the texture list
+    ])
+
+AMO_texture_entry = RecordLayout([
+    ("type",   "I", 0),
+    ("count",  "I", 1),
+    ("size",   "I", 0x10C),
+    ("index",  "I"), # 0x0C
+    ("width",  "I"), # 0x10
+    ("height", "I"), # 0x14
+    (None,     f"{0xF4}x")
+    ])
+
+# data of the Attributes sector, after its header
+AMO_mesh_attributes = RecordLayout([(name, "I") for name in (
+    "AMO_RenderDistance", "AMO_Unknown_0x10", "AMO_Unknown_0x14", "AMO_Culling",
+    "AMO_Scissor", "AMO_Light", "AMO_Unknown_0x24", "AMO_UVScroll",
+    "AMO_Unknown_0x2C", "AMO_FadeColor", "AMO_Special", "AMO_Unknown_0x38",
+    "AMO_Unknown_0x3C", "AMO_Unknown_0x40", "AMO_Unknown_0x44", "AMO_Unknown_0x48",
+    "AMO_Unknown_0x4C", "AMO_Unknown_0x50")])
+
+AHI_bone_node = RecordLayout([
+    ("type",                "I"), # BoneNode OR'd by the bone type
+    ("count",               "I", 1),
+    ("size",                "I", 0x10C),
+    ("index",               "i"),  # 0x0C
+    ("parent",              "i"),  # 0x10, -1 if there's none
+    ("child",               "i"),  # 0x14
+    ("brother",             "i"),  # 0x18
+    ("shadow_scale",        "4f"), # 0x1C
+    ("rotation",            "4f"), # 0x2C, radians, w is always 1.0
+    ("position",            "4f"), # 0x3C, w is always 1.0
+    ("attached_mesh_index", "i"),  # 0x4C
+    (None,                  f"{0xBC}x")
+    ])
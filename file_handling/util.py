@@ -1,5 +1,6 @@
 import re
 import math, mathutils
+import numpy as np
 from itertools import groupby
 
 
@@ -15,6 +16,24 @@ def flip_yz(vector):
     rotation = mathutils.Euler((math.radians(-90.0), 0.0, 0.0), 'XYZ')
     vector.rotate(rotation)
 
+def get_axis_matrix(angle, scale=1.0):
+    # same rotation as flip_zy (90) and flip_yz (-90) but for whole numpy arrays, with the scale folded in
+    # rows are rotated with array @ matrix.T
+    # built like mathutils builds it from an Euler: the angle is stored as a float32 and the cos and sin of
+    # that float32 angle are rounded to float32, so cos(90) is -4.371139e-08 rather than 6.1e-17
+    angle = float(np.float32(math.radians(angle)))
+    cos, sin = float(np.float32(math.cos(angle))) * scale, float(np.float32(math.sin(angle))) * scale
+    return np.array(((scale, 0.0,  0.0),
+                     (0.0,   cos, -sin),
+                     (0.0,   sin,  cos)), dtype=np.float32)
+
+def flip_yz_array(array):
+    # flip_yz for every row of an (n, 3) float32 array
+    # written out term by term in float32, in the order Vector.rotate adds them, instead of a single @ product
+    # which can round the last bit differently
+    matrix = get_axis_matrix(-90.0)
+    return array[:, 0:1] * matrix[:, 0] + array[:, 1:2] * matrix[:, 1] + array[:, 2:3] * matrix[:, 2]
+
 # to properly sort children names
 # https://stackoverflow.com/questions/58861558/natural-sorting-of-a-list-in-python3
 